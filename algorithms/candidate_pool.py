@@ -0,0 +1,94 @@
+# algorithms/candidate_pool.py
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# How long a search query's results are reused across recommendations (seconds)
+SEARCH_POOL_TTL = int(os.getenv("ASHDJ_SEARCH_POOL_TTL", "1800"))
+
+# How many distinct queries the shared pool remembers
+SEARCH_POOL_MAX_QUERIES = 256
+
+
+class CandidatePool:
+    """
+    Insertion-ordered, de-duplicated set of candidate tracks for one seed.
+    Membership checks are O(1) set/dict lookups instead of list scans.
+    """
+
+    def __init__(self, exclude_ids=()):
+        self._tracks = {}
+        self._excluded = set(exclude_ids)
+
+    def add(self, tracks):
+        """Add tracks not seen before; returns how many were new."""
+        added = 0
+        for track in tracks:
+            if not track or not track.get('id'):
+                continue
+            track_id = track['id']
+            if track_id in self._excluded or track_id in self._tracks:
+                continue
+            self._tracks[track_id] = track
+            added += 1
+        return added
+
+    def __len__(self):
+        return len(self._tracks)
+
+    def __contains__(self, track_id):
+        return track_id in self._tracks
+
+    def tracks(self):
+        return list(self._tracks.values())
+
+
+class SharedSearchPool:
+    """
+    Process-wide search results keyed by query string, with expiry.
+    Seed-independent queries ("genre:pop", "year:2020-2024", ...) are answered
+    once and reused by every recommendation until they expire.
+    """
+
+    def __init__(self, ttl=SEARCH_POOL_TTL, max_queries=SEARCH_POOL_MAX_QUERIES):
+        self.ttl = ttl
+        self.max_queries = max_queries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, query):
+        """Cached tracks for the query, or None if unknown or expired."""
+        with self._lock:
+            entry = self._entries.get(query)
+            if entry is None or time.time() - entry[0] > self.ttl:
+                self._entries.pop(query, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(query)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, query, tracks):
+        with self._lock:
+            self._entries[query] = (time.time(), list(tracks))
+            self._entries.move_to_end(query)
+            while len(self._entries) > self.max_queries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {"queries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_shared_pool = SharedSearchPool()
+
+
+def get_shared_search_pool():
+    return _shared_pool
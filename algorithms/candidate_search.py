@@ -0,0 +1,123 @@
+# algorithms/candidate_search.py
+
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from algorithms.candidate_pool import CandidatePool, get_shared_search_pool
+
+# How many sp.search() calls may be in flight at once
+SEARCH_CONCURRENCY = int(os.getenv("ASHDJ_SEARCH_CONCURRENCY", "4"))
+
+
+class SearchFanOut:
+    """
+    Run candidate search queries on a bounded thread pool and collect the
+    results into one de-duplicated pool. Once the searches that went to the
+    network have found `target` tracks, the queries that have not started
+    yet are cancelled.
+
+    Queries are started in submission order, so the most relevant ones
+    (seed artist, related artists) should be submitted first; collect()
+    also returns the tracks in submission order. Queries already answered
+    by the shared search pool need no network call, but their results don't
+    count towards `target`: otherwise a cached generic query ("genre:pop")
+    would fill the pool and cancel the seed-specific searches still in
+    flight. Fresh results are added to the shared pool for later requests.
+
+    `should_stop`, if given, is polled before each query and while
+    collecting; once it returns True the remaining queries are abandoned.
+    """
+
+    def __init__(self, sp, target=100, exclude_ids=(), max_workers=None, limit=20, shared_pool=None,
+                 should_stop=None):
+        self.sp = sp
+        self.target = target
+        self.should_stop = should_stop or (lambda: False)
+        self.limit = limit
+        self.exclude_ids = set(exclude_ids)
+        self.pool = CandidatePool(exclude_ids)  # tracks found by this fan-out; decides is_full()
+        self.shared_pool = shared_pool or get_shared_search_pool()
+        self._results = []  # one slot per add()/submit(), in submission order
+        self._futures = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, max_workers or SEARCH_CONCURRENCY),
+            thread_name_prefix="search"
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _slot(self, tracks=None):
+        with self._lock:
+            self._results.append(tracks)
+            return len(self._results) - 1
+
+    def submit(self, query):
+        """Queue a search query unless the pool is already full."""
+        if self.is_full():
+            return
+        cached = self.shared_pool.get(self._pool_key(query))
+        if cached is not None:
+            self._slot(cached)
+            return
+        # Run in a copy of the caller's context so per-command tags follow the query
+        slot = self._slot()
+        context = contextvars.copy_context()
+        self._futures.append(self._executor.submit(context.run, self._run, query, slot))
+
+    def add(self, tracks):
+        """Add seed-specific tracks found without a search (e.g. from the local library)."""
+        self._merge(self._slot(tracks), tracks)
+
+    def is_full(self):
+        with self._lock:
+            return len(self.pool) >= self.target
+
+    def _pool_key(self, query):
+        return f"{query}|{self.limit}"
+
+    def _run(self, query, slot):
+        # The pool may have filled (or the caller given up) while this query was waiting
+        if self.is_full() or self.should_stop():
+            return
+        try:
+            results = self.sp.search(q=query, type="track", limit=self.limit)
+            tracks = results['tracks']['items']
+            self.shared_pool.put(self._pool_key(query), tracks)
+            self._merge(slot, tracks)
+        except Exception as e:
+            print(f"⚠️  Search query '{query}' failed: {e}")
+
+    def _merge(self, slot, tracks):
+        with self._lock:
+            self._results[slot] = tracks
+            self.pool.add(tracks)
+
+    def collect(self):
+        """
+        Wait for queries to finish, stopping early once the target is met.
+        Returns every track found (searched or cached) in submission order.
+        """
+        for _ in as_completed(self._futures):
+            if self.is_full() or self.should_stop():
+                break
+        self.cancel_pending()
+        merged = CandidatePool(self.exclude_ids)
+        with self._lock:
+            for tracks in self._results:
+                if tracks:
+                    merged.add(tracks)
+        return merged.tracks()
+
+    def cancel_pending(self):
+        for future in self._futures:
+            future.cancel()
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,181 @@
+# algorithms/feature_estimator.py
+
+import hashlib
+from functools import lru_cache
+
+import numpy as np
+
+# Audio features we'll extract from audio analysis
+AUDIO_FEATURES = [
+    "danceability", "energy", "key", "loudness", "mode",
+    "speechiness", "acousticness", "instrumentalness", 
+    "liveness", "valence", "tempo"
+]
+
+FEATURE_INDEX = {name: i for i, name in enumerate(AUDIO_FEATURES)}
+
+# Bump whenever the estimation logic changes: stored vectors carry the schema
+# they were computed with and are thrown away when it no longer matches.
+# v2: key/mode/variance come from fingerprint() instead of per-process hash().
+FEATURE_SCHEMA_VERSION = 2
+FEATURE_SCHEMA = f"v{FEATURE_SCHEMA_VERSION}:{','.join(AUDIO_FEATURES)}"
+
+# Fixed key so fingerprints are the same in every process and on every machine
+FINGERPRINT_KEY = b"ashdj-feature-fingerprint"
+
+# Genre-based sophisticated adjustments
+GENRE_WEIGHTS = {
+    'electronic': {'danceability': +0.4, 'energy': +0.3, 'instrumentalness': +0.3, 'acousticness': -0.3},
+    'edm': {'danceability': +0.5, 'energy': +0.4, 'valence': +0.2, 'tempo': +0.3},
+    'dance': {'danceability': +0.4, 'energy': +0.3, 'valence': +0.2, 'tempo': +0.2},
+    'pop': {'danceability': +0.2, 'valence': +0.3, 'energy': +0.1, 'speechiness': +0.1},
+    'rock': {'energy': +0.4, 'loudness': +0.3, 'acousticness': -0.2, 'instrumentalness': +0.1},
+    'metal': {'energy': +0.5, 'loudness': +0.4, 'valence': -0.1, 'acousticness': -0.4},
+    'jazz': {'acousticness': +0.4, 'instrumentalness': +0.4, 'liveness': +0.2, 'tempo': -0.1},
+    'classical': {'acousticness': +0.5, 'instrumentalness': +0.5, 'speechiness': -0.05, 'energy': -0.2},
+    'hip hop': {'speechiness': +0.4, 'danceability': +0.2, 'energy': +0.1},
+    'rap': {'speechiness': +0.5, 'danceability': +0.1, 'valence': +0.1},
+    'country': {'acousticness': +0.3, 'valence': +0.2, 'speechiness': +0.1},
+    'folk': {'acousticness': +0.4, 'energy': -0.2, 'instrumentalness': +0.2},
+    'r&b': {'danceability': +0.3, 'valence': +0.2, 'energy': +0.1},
+    'soul': {'valence': +0.3, 'energy': +0.2, 'acousticness': +0.1},
+    'funk': {'danceability': +0.4, 'energy': +0.3, 'valence': +0.3},
+    'blues': {'valence': -0.1, 'acousticness': +0.2, 'energy': -0.1},
+    'reggae': {'danceability': +0.3, 'tempo': -0.2, 'valence': +0.2},
+    'ambient': {'energy': -0.3, 'instrumentalness': +0.4, 'acousticness': +0.2},
+    'indie': {'acousticness': +0.2, 'energy': +0.1, 'valence': +0.1}
+}
+
+GENRE_KEYS = list(GENRE_WEIGHTS)
+
+# One weight vector and one "touched features" mask per genre key. The extra
+# last row is all zeros and is used to pad tracks with fewer genre matches.
+GENRE_WEIGHT_VECTORS = np.zeros((len(GENRE_KEYS) + 1, len(AUDIO_FEATURES)))
+GENRE_WEIGHT_MASKS = np.zeros((len(GENRE_KEYS) + 1, len(AUDIO_FEATURES)), dtype=bool)
+for _row, _key in enumerate(GENRE_KEYS):
+    for _feature, _weight in GENRE_WEIGHTS[_key].items():
+        GENRE_WEIGHT_VECTORS[_row, FEATURE_INDEX[_feature]] = _weight
+        GENRE_WEIGHT_MASKS[_row, FEATURE_INDEX[_feature]] = True
+NO_GENRE = len(GENRE_KEYS)
+
+
+@lru_cache(maxsize=65536)
+def fingerprint(value):
+    """
+    Deterministic 64-bit fingerprint of a string (keyed BLAKE2b), unlike the
+    salted hash(). None (local/unavailable tracks have no id) counts as "".
+    """
+    digest = hashlib.blake2b(str(value or "").encode("utf-8"), digest_size=8, key=FINGERPRINT_KEY).digest()
+    return int.from_bytes(digest, "little")
+
+
+@lru_cache(maxsize=8192)
+def genre_key_matches(genre):
+    """Rows of GENRE_WEIGHT_VECTORS whose key is a substring of this (lowercased) genre."""
+    return tuple(row for row, key in enumerate(GENRE_KEYS) if key in genre)
+
+
+def _release_year(track):
+    release_date = track.get('album', {}).get('release_date', '')
+    if release_date:
+        try:
+            return int(release_date[:4])
+        except:
+            pass
+    return 2020
+
+
+def estimate_features_batch(tracks, artists):
+    """
+    Vectorized equivalent of get_enhanced_track_features + extract_audio_features
+    for many tracks at once. `artists` is aligned with `tracks` and holds each
+    track's primary artist object (None/{} for unknown - no API calls are made).
+    Returns an N x len(AUDIO_FEATURES) float64 matrix, row-for-row identical to
+    the scalar path.
+    """
+    n = len(tracks)
+    F = np.empty((n, len(AUDIO_FEATURES)))
+    if n == 0:
+        return F
+
+    # Gather the per-track scalars in one Python pass; everything after this is column math
+    popularity = np.empty(n)
+    duration_ms = np.empty(n)
+    release_year = np.empty(n)
+    followers = np.empty(n)
+    id_hash = np.empty(n, dtype=np.int64)
+    name_hash = np.empty(n, dtype=np.int64)
+    genre_rows = []
+
+    for i, (track, artist) in enumerate(zip(tracks, artists)):
+        popularity[i] = track.get('popularity', 50) / 100.0
+        duration_ms[i] = track.get('duration_ms', 200000)
+        release_year[i] = _release_year(track)
+        followers[i] = artist.get('followers', {}).get('total', 100000) if artist else 100000
+
+        track_hash = fingerprint(track.get('id', ''))
+        id_hash[i] = track_hash % 1200  # keeps both the %12 key and %100 variance intact
+        name_hash[i] = fingerprint(track.get('name', '')) % 2
+
+        rows = ()
+        if artist and 'genres' in artist:
+            for genre in artist['genres']:
+                rows += genre_key_matches(genre.lower())
+        genre_rows.append(rows)
+
+    # Base features
+    F[:, 0] = 0.3 + (popularity * 0.4)
+    F[:, 1] = 0.4 + (popularity * 0.3)
+    F[:, 2] = id_hash % 12 / 11.0
+    F[:, 3] = 0.3 + (popularity * 0.4)
+    F[:, 4] = name_hash
+    F[:, 5] = 0.05
+    F[:, 6] = 0.2
+    F[:, 7] = 0.1
+    F[:, 8] = 0.1 + (followers / 50000000)
+    F[:, 9] = 0.4 + (popularity * 0.3)
+    F[:, 10] = 0.5
+
+    # Genre weights are applied (and clamped) one match at a time in the scalar
+    # path, so apply them in rounds: round r adds every track's r-th match.
+    rounds = max(len(rows) for rows in genre_rows)
+    if rounds:
+        match_index = np.full((n, rounds), NO_GENRE)
+        for i, rows in enumerate(genre_rows):
+            match_index[i, :len(rows)] = rows
+        for r in range(rounds):
+            weights = GENRE_WEIGHT_VECTORS[match_index[:, r]]
+            mask = GENRE_WEIGHT_MASKS[match_index[:, r]]
+            F = np.where(mask, np.clip(F + weights, 0.0, 1.0), F)
+
+    dance, energy, acoustic, instrumental, live, valence = 0, 1, 6, 7, 8, 9
+
+    # Temporal adjustments (music trends over time)
+    recent = release_year >= 2020
+    twenty_tens = ~recent & (release_year >= 2010)
+    old = ~recent & ~twenty_tens & (release_year <= 1990)
+    F[recent, dance] += 0.1
+    F[recent, energy] += 0.05
+    F[twenty_tens, energy] += 0.1
+    F[old, acoustic] += 0.2
+    F[old, live] += 0.1
+
+    # Duration-based adjustments
+    long = duration_ms > 300000
+    short = ~long & (duration_ms < 120000)
+    F[long, instrumental] += 0.1
+    F[long, energy] -= 0.05
+    F[short, energy] += 0.1
+    F[short, dance] += 0.1
+
+    # Popularity-based refinements
+    hits = popularity > 0.8
+    niche = ~hits & (popularity < 0.3)
+    F[hits, dance] += 0.1
+    F[hits, valence] += 0.1
+    F[niche, acoustic] += 0.1
+    F[niche, instrumental] += 0.05
+
+    # Controlled per-track variance, ±0.05
+    variance = ((id_hash[:, None] + np.arange(len(AUDIO_FEATURES))) % 100) / 1000.0 - 0.05
+    return np.clip(F + variance, 0.0, 1.0)
@@ -0,0 +1,267 @@
+# algorithms/feature_store.py
+
+import json
+import os
+import threading
+
+import numpy as np
+
+from algorithms.feature_estimator import AUDIO_FEATURES, FEATURE_SCHEMA
+from algorithms.metadata_cache import CACHE_DIR
+
+INITIAL_CAPACITY = 1024
+
+# Compact when superseded rows make up more than this share of the file
+COMPACT_GARBAGE_RATIO = 0.5
+
+
+class FeatureStore:
+    """
+    Persistent track-ID -> feature-vector store.
+
+    Vectors live in a memory-mapped float32 file (one row per write) and the
+    row order is recorded in an append-only ID log, so a restarted process
+    can answer from earlier sessions without loading everything into RAM.
+    Re-writing a track appends a new row; compact() drops the stale ones.
+
+    Each compaction writes a new generation of both files and then switches
+    the CURRENT pointer atomically, so a crash never pairs IDs with the
+    wrong rows.
+
+    CURRENT also records the feature schema the vectors were computed with;
+    a store written under a different schema (or dimension) is discarded
+    and started afresh on open.
+    """
+
+    def __init__(self, directory=None, dim=len(AUDIO_FEATURES), schema=FEATURE_SCHEMA):
+        self.directory = directory or os.path.join(CACHE_DIR, "features")
+        self.dim = dim
+        self.schema = schema
+        self._lock = threading.RLock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._open()
+
+    # ---- files ----
+
+    def _path(self, kind, generation):
+        suffix = "f32" if kind == "features" else "txt"
+        return os.path.join(self.directory, f"{kind}.{generation}.{suffix}")
+
+    def _read_current(self):
+        try:
+            with open(os.path.join(self.directory, "CURRENT")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_current(self, generation):
+        current = os.path.join(self.directory, "CURRENT")
+        with open(current + ".tmp", "w") as f:
+            json.dump({"generation": generation, "dim": self.dim, "schema": self.schema}, f)
+        os.replace(current + ".tmp", current)
+
+    def _remove_generation(self, generation):
+        for kind in ("features", "ids"):
+            try:
+                os.remove(self._path(kind, generation))
+            except OSError:
+                pass
+
+    def _open(self):
+        meta = self._read_current()
+        if meta is not None and (meta.get("dim") != self.dim or meta.get("schema") != self.schema):
+            print(f"♻️  Feature store schema changed ({meta.get('schema', 'unversioned')} → "
+                  f"{self.schema}), discarding stored vectors")
+            self._remove_generation(meta.get("generation", 0))
+            meta = {"generation": meta.get("generation", 0) + 1, "fresh": True}
+
+        if meta is None or meta.get("fresh"):
+            self.generation = meta["generation"] if meta else 0
+            self._create_generation(self.generation, capacity=INITIAL_CAPACITY)
+            self._write_current(self.generation)
+        else:
+            self.generation = meta["generation"]
+
+        features_path = self._path("features", self.generation)
+        row_bytes = self.dim * 4
+        capacity = os.path.getsize(features_path) // row_bytes
+        self._map(capacity)
+
+        with open(self._path("ids", self.generation)) as f:
+            ids = f.read().splitlines()
+        # IDs are only logged after their rows are flushed, so the log can only
+        # outrun the feature file if that was cut short. The readable rows are
+        # kept and immediately compacted into a new generation, so the log and
+        # the rows line up again (the lost rows would otherwise read as zeros
+        # once the file grows past them).
+        self._ids = ids
+        self._index = {track_id: row for row, track_id in enumerate(ids[:capacity])}
+        self._ids_file = open(self._path("ids", self.generation), "a")
+        if len(ids) > capacity:
+            print(f"⚠️  Feature store is missing {len(ids) - capacity} rows, dropping those entries")
+            self.compact()
+
+    def _create_generation(self, generation, capacity):
+        with open(self._path("features", generation), "wb") as f:
+            f.truncate(capacity * self.dim * 4)
+        open(self._path("ids", generation), "w").close()
+
+    def _map(self, capacity):
+        self.capacity = capacity
+        self._mm = np.memmap(self._path("features", self.generation), dtype=np.float32,
+                             mode="r+", shape=(capacity, self.dim))
+
+    def _grow(self, needed):
+        capacity = max(1, self.capacity)
+        while capacity < needed:
+            capacity *= 2
+        self._mm.flush()
+        with open(self._path("features", self.generation), "r+b") as f:
+            f.truncate(capacity * self.dim * 4)
+        self._map(capacity)
+
+    # ---- reads ----
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, track_id):
+        return track_id in self._index
+
+    def lookup(self, track_ids):
+        """Row number for each ID, -1 where the ID is not stored."""
+        with self._lock:
+            return np.array([self._index.get(t, -1) for t in track_ids], dtype=np.int64)
+
+    def view(self):
+        """Zero-copy view of every written row (including superseded ones)."""
+        with self._lock:
+            return self._mm[:len(self._ids)]
+
+    def rows(self, row_numbers):
+        """
+        Rows straight from the mapping; only the touched pages are read. A run of
+        consecutive row numbers (e.g. every row in file order) comes back as a
+        read-only zero-copy view, anything else has to be gathered into a copy.
+
+        Row numbers change when any thread's write triggers compact(), so ones
+        from an earlier lookup() can point at another track's row; read by ID
+        with gather() or snapshot() instead.
+        """
+        row_numbers = np.asarray(row_numbers, dtype=np.int64)
+        with self._lock:
+            if len(row_numbers) and (len(row_numbers) == 1 or (np.diff(row_numbers) == 1).all()):
+                view = self._mm[row_numbers[0]:row_numbers[-1] + 1]
+                view.flags.writeable = False
+                return view
+            return self._mm[row_numbers]
+
+    def gather(self, track_ids):
+        """
+        (matrix, found mask) for the given IDs: a copy of the rows of the found
+        ones, in the order given. Lookup and read happen under one lock, so a
+        compaction can't renumber the rows in between.
+        """
+        with self._lock:
+            rows = np.array([self._index.get(t, -1) for t in track_ids], dtype=np.int64)
+            found = rows >= 0
+            rows = rows[found]
+            # Read in file order so the mapping is scanned sequentially
+            order = np.argsort(rows)
+            matrix = np.empty((len(rows), self.dim), dtype=np.float32)
+            matrix[order] = self._mm[rows[order]]
+            return matrix, found
+
+    def snapshot(self):
+        """(track_ids, matrix): a copy of every live entry in file order, read under one lock."""
+        with self._lock:
+            track_ids, rows = self.items()
+            order = np.argsort(rows)
+            return [track_ids[i] for i in order], np.array(self._mm[rows[order]])
+
+    def items(self):
+        """(track_ids, row_numbers) for every live entry."""
+        with self._lock:
+            return list(self._index.keys()), np.fromiter(self._index.values(), dtype=np.int64,
+                                                         count=len(self._index))
+
+    # ---- writes ----
+
+    def put_many(self, track_ids, matrix):
+        """Append vectors for these IDs; later writes supersede earlier ones."""
+        matrix = np.asarray(matrix, dtype=np.float32).reshape(-1, self.dim)
+        if not len(track_ids):
+            return
+        with self._lock:
+            start = len(self._ids)
+            end = start + len(track_ids)
+            if end > self.capacity:
+                self._grow(end)
+            self._mm[start:end] = matrix
+            self._mm.flush()
+
+            self._ids_file.write("".join(f"{t}\n" for t in track_ids))
+            self._ids_file.flush()
+            for offset, track_id in enumerate(track_ids):
+                self._ids.append(track_id)
+                self._index[track_id] = start + offset
+
+            if self.garbage_ratio() > COMPACT_GARBAGE_RATIO and len(self._ids) > INITIAL_CAPACITY:
+                self.compact()
+
+    def garbage_ratio(self):
+        return 1.0 - len(self._index) / len(self._ids) if self._ids else 0.0
+
+    def compact(self):
+        """Rewrite only the live rows into a fresh generation and switch over to it."""
+        with self._lock:
+            track_ids, rows = self.items()
+            order = np.argsort(rows)
+            track_ids = [track_ids[i] for i in order]
+            rows = rows[order]
+
+            generation = self.generation + 1
+            capacity = max(INITIAL_CAPACITY, len(track_ids))
+            self._create_generation(generation, capacity)
+            new_mm = np.memmap(self._path("features", generation), dtype=np.float32,
+                               mode="r+", shape=(capacity, self.dim))
+            new_mm[:len(rows)] = self._mm[rows]
+            new_mm.flush()
+            del new_mm
+            with open(self._path("ids", generation), "w") as f:
+                f.write("".join(f"{t}\n" for t in track_ids))
+
+            self._write_current(generation)
+
+            old_generation = self.generation
+            self._ids_file.close()
+            self.generation = generation
+            self._mm = None
+            self._open()
+            self._remove_generation(old_generation)
+
+    def close(self):
+        with self._lock:
+            self._mm.flush()
+            self._ids_file.close()
+
+
+_default_store = None
+_default_store_failed = False
+_default_store_lock = threading.Lock()
+
+
+def get_default_store():
+    """
+    Process-wide feature store, opened on first use. Returns None if the disk
+    store can't be opened; that is only tried (and reported) once.
+    """
+    global _default_store, _default_store_failed
+    with _default_store_lock:
+        if _default_store is None and not _default_store_failed:
+            try:
+                _default_store = FeatureStore()
+            except (OSError, ValueError) as e:
+                _default_store_failed = True
+                print(f"⚠️  Feature store unavailable ({e}), features won't be persisted")
+        return _default_store
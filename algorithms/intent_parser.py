@@ -1,45 +1,95 @@
-# command/intent_parser.py
+# algorithms/intent_parser.py
 
+import json
+import os
 import re
 
+# Rules live in a data file so phrasings and mood words can change without code edits
+RULES_PATH = os.getenv("ASHDJ_INTENT_RULES",
+                       os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_rules.json"))
+
+
+def load_rules(path=RULES_PATH):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class IntentEngine:
+    """
+    Intent rules compiled once into single-pass matchers, checked in priority order:
+
+    1. slot_rules: "<trigger> <slot text>" phrasings. They are joined into one
+       anchored regex, (?:.*?(?P<r0>t0)\\s+(?P<s0>...))|(?:.*?(?P<r1>t1)...)|...,
+       where each alternative scans the whole input before the next one is
+       tried. That keeps "first rule that matches anywhere wins", like running
+       the patterns one after another. A rule only counts if its slot isn't blank.
+       A cheap search for any trigger at all gates it, since most inputs have none.
+    2. keyword_rules: whole-word keywords (so "remove" doesn't trigger "move"),
+       all matched in one regex pass. The earliest group in the table wins.
+    3. prefix_rules: the input starts with a fixed prefix; the rest is the slot.
+    """
+
+    def __init__(self, rules):
+        self.slot_rules = rules.get("slot_rules", [])
+        alternatives = []
+        for i, rule in enumerate(self.slot_rules):
+            alternatives.append(
+                rf"(?:(?s:.*?)(?P<r{i}>\b(?:{rule['trigger']}))\s+(?P<s{i}>.*\S.*))"
+            )
+        self._slot_matcher = re.compile("|".join(alternatives)) if alternatives else None
+        self._slot_gate = re.compile(
+            r"\b(?:" + "|".join(rule["trigger"] for rule in self.slot_rules) + ")"
+        ) if alternatives else None
+
+        keyword_rules = rules.get("keyword_rules") or {}
+        self.keyword_intent = keyword_rules.get("intent")
+        self.keyword_slot = keyword_rules.get("slot")
+        self.keyword_values = list(keyword_rules.get("keywords", {}))
+        groups = []
+        for i, value in enumerate(self.keyword_values):
+            words = sorted(keyword_rules["keywords"][value], key=len, reverse=True)
+            groups.append(f"(?P<k{i}>" + "|".join(re.escape(word) for word in words) + ")")
+        self._keyword_matcher = re.compile(r"\b(?:" + "|".join(groups) + r")\b") if groups else None
+
+        self.prefix_rules = rules.get("prefix_rules", [])
+
+    def parse(self, user_input):
+        user_input = user_input.lower()
+
+        if self._slot_matcher is not None and self._slot_gate.search(user_input):
+            match = self._slot_matcher.match(user_input)
+            if match:
+                i = int(match.lastgroup[1:])
+                rule = self.slot_rules[i]
+                return {"intent": rule["intent"], rule["slot"]: match.group(f"s{i}").strip()}
+
+        if self._keyword_matcher is not None:
+            best = None
+            for match in self._keyword_matcher.finditer(user_input):
+                rank = int(match.lastgroup[1:])
+                if best is None or rank < best:
+                    best = rank
+                    if rank == 0:
+                        break
+            if best is not None:
+                return {"intent": self.keyword_intent, self.keyword_slot: self.keyword_values[best]}
+
+        for rule in self.prefix_rules:
+            if user_input.startswith(rule["prefix"]):
+                return {"intent": rule["intent"], rule["slot"]: user_input[len(rule["prefix"]):].strip()}
+
+        return {"intent": "unknown"}
+
+
+_default_engine = None
+
+
+def get_default_engine():
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = IntentEngine(load_rules())
+    return _default_engine
+
+
 def parse_intent(user_input):
-    user_input = user_input.lower()
-
-    # Play similar to a given track - improved pattern matching
-    similar_patterns = [
-        r"play\s+(something\s+like|songs\s+like|music\s+like)\s+(.*)",
-        r"(something\s+like|songs\s+like|music\s+like)\s+(.*)",
-        r"play\s+(similar\s+to|like)\s+(.*)",
-        r"(similar\s+to|like)\s+(.*)"
-    ]
-    
-    for pattern in similar_patterns:
-        match = re.search(pattern, user_input)
-        if match:
-            # Extract the track query from the matched groups
-            if len(match.groups()) >= 2:
-                track_query = match.group(2).strip()
-            else:
-                track_query = match.group(1).strip()
-            
-            if track_query:  # Make sure we have a valid query
-                return {"intent": "play_similar", "track_query": track_query}
-
-    # Mood-based triggers
-    moods = {
-        "sad": ["sad", "depressed", "blue"],
-        "happy": ["happy", "joy", "cheerful"],
-        "romantic": ["romantic", "love", "valentine"],
-        "dance": ["dance", "party", "move"],
-        "chill": ["chill", "relax", "lofi", "calm"]
-    }
-
-    for mood, keywords in moods.items():
-        if any(word in user_input for word in keywords):
-            return {"intent": "play_mood", "mood": mood}
-
-    # Play specific fallback
-    if user_input.startswith("play "):
-        return {"intent": "play_exact", "query": user_input[5:].strip()}
-
-    return {"intent": "unknown"}
+    return get_default_engine().parse(user_input)
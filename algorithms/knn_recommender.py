@@ -1,17 +1,42 @@
 # recommend/knn_recommender.py
 
-from sklearn.neighbors import NearestNeighbors
 import numpy as np
+import os
+import threading
 import time
 import spotipy
 import requests
 
-# Audio features we'll extract from audio analysis
-AUDIO_FEATURES = [
-    "danceability", "energy", "key", "loudness", "mode",
-    "speechiness", "acousticness", "instrumentalness", 
-    "liveness", "valence", "tempo"
-]
+from algorithms.candidate_pool import get_shared_search_pool
+from algorithms.candidate_search import SearchFanOut
+from algorithms.feature_estimator import (
+    AUDIO_FEATURES, GENRE_WEIGHTS, estimate_features_batch, fingerprint,
+)
+from algorithms.feature_store import get_default_store
+from algorithms.metadata_cache import (
+    get_default_cache, get_track, get_artist, get_tracks, get_artists, get_related_artists
+)
+from algorithms.similarity import top_k
+from algorithms.track_library import get_default_library
+
+# Candidate searches stop once this many unique tracks are pooled
+CANDIDATE_POOL_TARGET = 100
+
+# How many candidates get features computed per recommendation
+MAX_COMPARISON_TRACKS = 40
+
+# Candidates taken from the synced local library (nearest to the seed) before searching
+LOCAL_CANDIDATES = int(os.getenv("ASHDJ_LOCAL_CANDIDATES", "15"))
+
+# Batch recommendations grow the shared pool by this much per extra seed, up to the cap
+BATCH_POOL_PER_SEED = 20
+MAX_BATCH_POOL = 300
+
+# Batch searches: at most this many seed artists, and related artists per seed artist
+MAX_BATCH_SEED_ARTISTS = 10
+BATCH_RELATED_ARTISTS = 2
+
+BATCH_AGGREGATIONS = ("round_robin", "centroid")
 
 def get_audio_features_from_analysis(sp, track_id):
     """
@@ -60,7 +85,7 @@ def try_alternative_audio_features(sp, track_id):
     
     # Method 2: Use track popularity and other metadata to estimate features
     try:
-        track_info = sp.track(track_id)
+        track_info = get_track(sp, track_id)
         if track_info:
             # Create enhanced estimated features based on available data
             estimated_features = get_enhanced_track_features(sp, track_info)
@@ -94,7 +119,7 @@ def get_enhanced_track_features(sp, track_info, artist_info=None):
     if not artist_info and track_info.get('artists'):
         try:
             artist_id = track_info['artists'][0]['id']
-            artist_info = sp.artist(artist_id)
+            artist_info = get_artist(sp, artist_id)
         except:
             artist_info = {}
     
@@ -111,9 +136,9 @@ def get_enhanced_track_features(sp, track_info, artist_info=None):
     features = {
         'danceability': 0.3 + (popularity * 0.4),  # Popular songs tend to be more danceable
         'energy': 0.4 + (popularity * 0.3),
-        'key': hash(track_info.get('id', '')) % 12 / 11.0,  # Pseudo-random but consistent key
+        'key': fingerprint(track_info.get('id', '')) % 12 / 11.0,  # Pseudo-random but consistent key
         'loudness': 0.3 + (popularity * 0.4),
-        'mode': 1 if hash(track_info.get('name', '')) % 2 else 0,  # Pseudo-random mode
+        'mode': 1 if fingerprint(track_info.get('name', '')) % 2 else 0,  # Pseudo-random mode
         'speechiness': 0.05,
         'acousticness': 0.2,
         'instrumentalness': 0.1,
@@ -122,32 +147,9 @@ def get_enhanced_track_features(sp, track_info, artist_info=None):
         'tempo': 0.5
     }
     
-    # Genre-based sophisticated adjustments
-    genre_weights = {
-        'electronic': {'danceability': +0.4, 'energy': +0.3, 'instrumentalness': +0.3, 'acousticness': -0.3},
-        'edm': {'danceability': +0.5, 'energy': +0.4, 'valence': +0.2, 'tempo': +0.3},
-        'dance': {'danceability': +0.4, 'energy': +0.3, 'valence': +0.2, 'tempo': +0.2},
-        'pop': {'danceability': +0.2, 'valence': +0.3, 'energy': +0.1, 'speechiness': +0.1},
-        'rock': {'energy': +0.4, 'loudness': +0.3, 'acousticness': -0.2, 'instrumentalness': +0.1},
-        'metal': {'energy': +0.5, 'loudness': +0.4, 'valence': -0.1, 'acousticness': -0.4},
-        'jazz': {'acousticness': +0.4, 'instrumentalness': +0.4, 'liveness': +0.2, 'tempo': -0.1},
-        'classical': {'acousticness': +0.5, 'instrumentalness': +0.5, 'speechiness': -0.05, 'energy': -0.2},
-        'hip hop': {'speechiness': +0.4, 'danceability': +0.2, 'energy': +0.1},
-        'rap': {'speechiness': +0.5, 'danceability': +0.1, 'valence': +0.1},
-        'country': {'acousticness': +0.3, 'valence': +0.2, 'speechiness': +0.1},
-        'folk': {'acousticness': +0.4, 'energy': -0.2, 'instrumentalness': +0.2},
-        'r&b': {'danceability': +0.3, 'valence': +0.2, 'energy': +0.1},
-        'soul': {'valence': +0.3, 'energy': +0.2, 'acousticness': +0.1},
-        'funk': {'danceability': +0.4, 'energy': +0.3, 'valence': +0.3},
-        'blues': {'valence': -0.1, 'acousticness': +0.2, 'energy': -0.1},
-        'reggae': {'danceability': +0.3, 'tempo': -0.2, 'valence': +0.2},
-        'ambient': {'energy': -0.3, 'instrumentalness': +0.4, 'acousticness': +0.2},
-        'indie': {'acousticness': +0.2, 'energy': +0.1, 'valence': +0.1}
-    }
-    
     # Apply genre weights
     for genre in genres:
-        for genre_key, weights in genre_weights.items():
+        for genre_key, weights in GENRE_WEIGHTS.items():
             if genre_key in genre:
                 for feature, weight in weights.items():
                     features[feature] = max(0.0, min(1.0, features[feature] + weight))
@@ -179,7 +181,7 @@ def get_enhanced_track_features(sp, track_info, artist_info=None):
         features['instrumentalness'] += 0.05
     
     # Add some controlled randomness based on track ID for variety
-    track_hash = hash(track_info.get('id', ''))
+    track_hash = fingerprint(track_info.get('id', ''))
     for i, feature_key in enumerate(features.keys()):
         variance = ((track_hash + i) % 100) / 1000.0 - 0.05  # ±0.05 variance
         features[feature_key] = max(0.0, min(1.0, features[feature_key] + variance))
@@ -197,81 +199,212 @@ def extract_audio_features(features_dict):
     return np.array(feature_vector)
 
 
-def build_enhanced_feature_matrix(sp, seed_track_id, sample_tracks):
-    """Build matrix using enhanced feature estimation for more authentic recommendations."""
-    all_features = []
-    track_info = []
+def _primary_artist(sp, track, artists_by_id):
+    """Pre-fetched artist object for a track's first artist, looked up singly if the batch missed it."""
+    if not track.get('artists'):
+        return None
+    artist_id = track['artists'][0].get('id')
+    if artist_id in artists_by_id:
+        return artists_by_id[artist_id]
+    try:
+        return get_artist(sp, artist_id)
+    except:
+        return {}
+
+
+def _track_entry(track, features_dict, is_seed=False):
+    return {
+        'uri': track.get('uri', ''),
+        'name': track.get('name', ''),
+        'artist': track['artists'][0]['name'] if track.get('artists') else '',
+        'is_seed': is_seed,
+        'features': features_dict
+    }
+
+
+def _estimate_track_by_track(sp, tracks, artists):
+    """Scalar fallback: estimate each track separately. Returns (matrix, ok mask)."""
+    matrix = np.zeros((len(tracks), len(AUDIO_FEATURES)))
+    ok = np.zeros(len(tracks), dtype=bool)
+    for i, (track, artist) in enumerate(zip(tracks, artists)):
+        try:
+            matrix[i] = extract_audio_features(get_enhanced_track_features(sp, track, artist_info=artist))
+            ok[i] = True
+        except Exception as e:
+            print(f"⚠️  Error processing track {track.get('name', 'Unknown')}: {e}")
+    return matrix, ok
+
+
+def _fetch_estimation_metadata(sp, tracks):
+    """
+    Hydrate partial tracks and resolve their primary artists in bulk.
+    Candidates from playlist/album endpoints lack popularity and album data;
+    they are fetched with one sp.tracks() call per 50 instead of one each, and
+    every artist is resolved in one pass (sp.artists, 50 per call) rather than
+    one sp.artist() round trip per candidate.
+    """
+    artists_by_id = {}
+    try:
+        partial_ids = [t['id'] for t in tracks if 'popularity' not in t or 'album' not in t]
+        if partial_ids:
+            full_tracks = get_tracks(sp, partial_ids)
+            tracks = [full_tracks.get(t['id'], t) for t in tracks]
+        
+        artist_ids = [
+            t['artists'][0]['id'] for t in tracks
+            if t.get('artists') and t['artists'][0].get('id')
+        ]
+        artists_by_id = get_artists(sp, artist_ids)
+    except Exception as e:
+        print(f"⚠️  Batch metadata fetch failed, falling back to per-track lookups: {e}")
+    
+    return tracks, [_primary_artist(sp, track, artists_by_id) for track in tracks]
+
+
+def _feature_rows(sp, tracks):
+    """
+    Feature rows for `tracks`: rows computed in earlier requests (or sessions)
+    come straight from the feature store, the rest are estimated in one
+    vectorized pass and stored. Returns (matrix, valid mask, stored count).
+    """
+    track_ids = [t['id'] for t in tracks]
+    feature_matrix = np.zeros((len(tracks), len(AUDIO_FEATURES)), dtype=np.float32)
+    
+    store = get_default_store()
+    if store is not None:
+        stored_matrix, stored = store.gather(track_ids)
+        feature_matrix[stored] = stored_matrix
+    else:
+        stored = np.zeros(len(tracks), dtype=bool)
+    
+    missing = np.flatnonzero(~stored)
+    valid = stored.copy()
+    if len(missing):
+        missing_tracks, artists = _fetch_estimation_metadata(sp, [tracks[i] for i in missing])
+        try:
+            estimated = estimate_features_batch(missing_tracks, artists)
+            estimated_ok = np.ones(len(missing), dtype=bool)
+        except Exception as e:
+            print(f"⚠️  Batch feature estimation failed, estimating track by track: {e}")
+            estimated, estimated_ok = _estimate_track_by_track(sp, missing_tracks, artists)
+        
+        feature_matrix[missing] = estimated
+        valid[missing] = estimated_ok
+        if store is not None:
+            store.put_many([track_ids[i] for i in missing[estimated_ok]], estimated[estimated_ok])
+    
+    return feature_matrix, valid, int(stored.sum())
+
+
+_library_matrix = None  # (cache key, track ids, feature matrix)
+_library_matrix_lock = threading.Lock()
+
+
+def _library_feature_matrix(library, store):
+    """
+    (track ids, feature rows) for every library track with stored features,
+    built once and reused until the library's next sync bumps its version.
+    """
+    global _library_matrix
+    key = (id(library), library.version, id(store))
+    with _library_matrix_lock:
+        if _library_matrix is not None and _library_matrix[0] == key:
+            return _library_matrix[1], _library_matrix[2]
+    
+    track_ids = library.track_ids()
+    matrix, known = store.gather(track_ids)  # Own copy: outlives store compactions
+    track_ids = [track_id for track_id, ok in zip(track_ids, known) if ok]
+    
+    with _library_matrix_lock:
+        _library_matrix = (key, track_ids, matrix)
+    return track_ids, matrix
+
+
+def _library_available():
+    """True if the synced library has tracks with stored features to draw candidates from."""
+    library = get_default_library()
+    store = get_default_store()
+    return library is not None and store is not None and bool(_library_feature_matrix(library, store)[0])
+
+
+def _library_candidates(seed_ids, seed_matrix, count):
+    """
+    Up to `count` tracks from the local library nearest to the seeds (one
+    feature row each in `seed_matrix`), taken in turn from each seed's
+    neighbours. No API calls: the library's rows were stored at sync time.
+    """
+    library = get_default_library()
+    store = get_default_store()
+    if library is None or store is None or count <= 0 or not len(seed_matrix):
+        return []
+    track_ids, matrix = _library_feature_matrix(library, store)
+    if not track_ids:
+        return []
     
+    seed_ids = set(seed_ids)
+    _, indices = top_k(matrix, seed_matrix, count + len(seed_ids))
+    picked = [track_ids[i] for i in _round_robin(indices, count + len(seed_ids))]
+    picked = [track_id for track_id in picked if track_id not in seed_ids][:count]
+    
+    found = library.tracks(picked)
+    return [found[track_id] for track_id in picked if track_id in found]
+
+
+def build_enhanced_feature_matrix(sp, seed_track_id, sample_tracks, seed_track=None, seed_features=None):
+    """
+    Build matrix using enhanced feature estimation for more authentic recommendations.
+    Callers that already have the seed track and its feature row can pass them in.
+    """
     print("🎵 Getting enhanced features for seed track...")
     
-    # Get seed track info and features
+    # Pick the comparison candidates up front so their metadata can be fetched in bulk
+    candidates = [
+        track for track in sample_tracks
+        if track and 'id' in track and track['id'] != seed_track_id
+    ][:MAX_COMPARISON_TRACKS]
+    
+    # Get seed track info
     try:
-        seed_track = sp.track(seed_track_id)
-        seed_features_dict = get_enhanced_track_features(sp, seed_track)
-        if not seed_features_dict:
+        seed_track = seed_track or get_track(sp, seed_track_id)
+        if not seed_track:
             print("❌ Could not get features for seed track")
             return None, []
     except Exception as e:
         print(f"❌ Error getting seed track: {e}")
         return None, []
     
-    seed_features = extract_audio_features(seed_features_dict)
-    all_features.append(seed_features)
+    tracks = [seed_track] + candidates
+    if seed_features is None:
+        feature_matrix, valid, stored = _feature_rows(sp, tracks)
+    else:
+        candidate_matrix, candidate_valid, stored = _feature_rows(sp, candidates)
+        feature_matrix = np.vstack([np.asarray(seed_features, dtype=np.float32)[None], candidate_matrix])
+        valid = np.concatenate([[True], candidate_valid])
+    
+    if not valid[0]:
+        print("❌ Could not get features for seed track")
+        return None, []
     
-    track_info.append({
-        'uri': seed_track.get('uri', ''),
-        'name': seed_track.get('name', ''),
-        'artist': seed_track['artists'][0]['name'] if seed_track.get('artists') else '',
-        'is_seed': True,
-        'features': seed_features_dict
-    })
+    feature_matrix = feature_matrix[valid]
+    track_info = [
+        _track_entry(track, dict(zip(AUDIO_FEATURES, row.tolist())), is_seed=(i == 0))
+        for i, (track, row) in enumerate(zip([t for t, ok in zip(tracks, valid) if ok], feature_matrix))
+    ]
     
+    seed_features_dict = track_info[0]['features']
     print(f"✅ Got enhanced features for seed track")
     print(f"🎯 Seed features: danceability={seed_features_dict.get('danceability', 0):.2f}, "
           f"energy={seed_features_dict.get('energy', 0):.2f}, "
           f"valence={seed_features_dict.get('valence', 0):.2f}")
     
-    # Process sample tracks with enhanced features
-    successful_tracks = 0
-    
-    for track in sample_tracks:
-        if not track or 'id' not in track:
-            continue
-            
-        track_id = track['id']
-        if track_id == seed_track_id:  # Skip seed track
-            continue
-        
-        try:
-            # Get enhanced features for this track
-            features_dict = get_enhanced_track_features(sp, track)
-            if features_dict:
-                features_vector = extract_audio_features(features_dict)
-                all_features.append(features_vector)
-                
-                track_info.append({
-                    'uri': track.get('uri', ''),
-                    'name': track.get('name', ''),
-                    'artist': track['artists'][0]['name'] if track.get('artists') else '',
-                    'is_seed': False,
-                    'features': features_dict
-                })
-                
-                successful_tracks += 1
-                
-                if successful_tracks >= 40:  # Get more tracks for better variety
-                    break
-        except Exception as e:
-            print(f"⚠️  Error processing track {track.get('name', 'Unknown')}: {e}")
-            continue
-    
-    print(f"✅ Got enhanced features for {successful_tracks} comparison tracks")
+    print(f"✅ Got enhanced features for {len(track_info) - 1} comparison tracks "
+          f"({stored} from the feature store)")
     
-    if len(all_features) <= 1:
+    if len(track_info) <= 1:
         print("❌ Could not get enough features for comparison.")
         return None, []
     
-    return np.array(all_features), track_info
+    return feature_matrix, track_info
 
 
 def ensure_valid_token(sp):
@@ -282,8 +415,27 @@ def ensure_valid_token(sp):
         print("🔄 Refreshing Spotify access token...")
         auth_manager.refresh_access_token(token_info['refresh_token'])
 
-def find_similar_tracks(sp, current_track_id):
-    """Find similar tracks using authentic audio features analysis."""
+def _sklearn_kneighbors(feature_matrix, seed_features, n_neighbors, metric='euclidean'):
+    """Original NearestNeighbors path, kept for comparison (sklearn is imported on demand)."""
+    from sklearn.neighbors import NearestNeighbors
+    
+    knn = NearestNeighbors(n_neighbors=n_neighbors, algorithm='auto', metric=metric)
+    knn.fit(feature_matrix)
+    return knn.kneighbors([seed_features])
+
+
+def find_similar_tracks(sp, current_track_id, search_concurrency=None,
+                        metric='euclidean', feature_weights=None, use_sklearn=False,
+                        should_stop=None):
+    """
+    Find similar tracks using authentic audio features analysis.
+    search_concurrency caps parallel candidate searches (default: ASHDJ_SEARCH_CONCURRENCY).
+    metric ('euclidean' or 'cosine') and feature_weights (one weight per AUDIO_FEATURES
+    entry) tune the similarity engine; use_sklearn switches back to NearestNeighbors.
+    should_stop is polled between stages (and between searches); when it returns
+    True the work is abandoned and None is returned.
+    """
+    should_stop = should_stop or (lambda: False)
     
     try:
         print("🔍 Analyzing audio features for authentic recommendations...")
@@ -293,7 +445,7 @@ def find_similar_tracks(sp, current_track_id):
         
         # Get seed track info for better search queries
         try:
-            seed_track = sp.track(current_track_id)
+            seed_track = get_track(sp, current_track_id)
             if not seed_track:
                 print("❌ Could not get track information.")
                 return []
@@ -302,55 +454,53 @@ def find_similar_tracks(sp, current_track_id):
             return []
 
         print("✅ Got track information for seed track")
+        if should_stop():
+            return None
+        
+        # With a synced library the seed's features are needed up front to pick local
+        # candidates; they are then reused for the comparison matrix
+        seed_features = None
+        if _library_available():
+            seed_matrix, seed_valid, _ = _feature_rows(sp, [seed_track])
+            seed_features = seed_matrix[0] if seed_valid[0] else None
 
         # Get a diverse set of tracks for feature comparison
         print("🔍 Searching for candidate tracks...")
         
         # Build smart search queries based on the seed track
-        all_tracks = []
         seed_artist = seed_track['artists'][0]['name'] if seed_track.get('artists') else ""
         seed_artist_id = seed_track['artists'][0]['id'] if seed_track.get('artists') else None
         
-        # Get related artists for more diverse recommendations
-        related_artists = []
-        if seed_artist_id:
-            try:
-                related_response = sp.artist_related_artists(seed_artist_id)
-                related_artists = related_response.get('artists', [])[:5]  # Top 5 related artists
-            except:
-                pass
-        
-        search_queries = [
-            "year:2020-2024",
-            f"artist:{seed_artist}" if seed_artist else "genre:pop",
-        ]
-        
-        # Add searches for related artists
-        for artist in related_artists:
-            search_queries.append(f'artist:"{artist["name"]}"')
-        
-        # Add some genre-based searches
-        search_queries.extend([
-            "genre:pop", "genre:rock", "genre:electronic", 
-            "year:2018-2024", "year:2015-2022"
-        ])
-        
-        for query in search_queries:
-            try:
-                results = sp.search(q=query, type="track", limit=20)
-                tracks = results['tracks']['items']
-                # Filter out duplicates and the seed track itself
-                for track in tracks:
-                    if (track['id'] not in [t['id'] for t in all_tracks] and 
-                        track['id'] != current_track_id):
-                        all_tracks.append(track)
-                        
-                if len(all_tracks) >= 100:  # Enough tracks
-                    break
-                    
-            except Exception as e:
-                print(f"⚠️  Search query '{query}' failed: {e}")
-                continue
+        with SearchFanOut(sp, target=CANDIDATE_POOL_TARGET, exclude_ids={current_track_id},
+                          max_workers=search_concurrency, should_stop=should_stop) as fan_out:
+            # The user's own tracks come first, from the synced library
+            if seed_features is not None:
+                fan_out.add(_library_candidates([current_track_id], seed_matrix, LOCAL_CANDIDATES))
+            
+            # This doesn't depend on related artists, so start it while that lookup runs
+            fan_out.submit(f"artist:{seed_artist}" if seed_artist else "genre:pop")
+            
+            # Get related artists for more diverse recommendations
+            related_artists = []
+            if seed_artist_id:
+                try:
+                    related_artists = get_related_artists(sp, seed_artist_id)[:5]  # Top 5 related artists
+                except:
+                    pass
+            
+            # Add searches for related artists
+            for artist in related_artists:
+                fan_out.submit(f'artist:"{artist["name"]}"')
+            
+            # Add some genre-based searches
+            for query in ["year:2020-2024", "genre:pop", "genre:rock", "genre:electronic",
+                          "year:2018-2024", "year:2015-2022"]:
+                fan_out.submit(query)
+            
+            all_tracks = fan_out.collect()
+
+        if should_stop():
+            return None
 
         if len(all_tracks) < 10:
             print("❌ Could not find enough tracks for comparison.")
@@ -359,7 +509,9 @@ def find_similar_tracks(sp, current_track_id):
         print(f"📊 Found {len(all_tracks)} candidate tracks")
 
         # Build feature matrix using enhanced estimation
-        feature_matrix, track_info = build_enhanced_feature_matrix(sp, current_track_id, all_tracks[:80])
+        feature_matrix, track_info = build_enhanced_feature_matrix(sp, current_track_id, all_tracks[:80],
+                                                                   seed_track=seed_track,
+                                                                   seed_features=seed_features)
         
         if feature_matrix is None or len(feature_matrix) < 6:
             print("❌ Not enough features for authentic recommendations.")
@@ -372,10 +524,11 @@ def find_similar_tracks(sp, current_track_id):
         
         # Use KNN to find most similar tracks based on enhanced features
         n_neighbors = min(6, len(feature_matrix))  # Don't exceed available tracks
-        knn = NearestNeighbors(n_neighbors=n_neighbors, algorithm='auto', metric='euclidean')
-        knn.fit(feature_matrix)
-        
-        distances, indices = knn.kneighbors([seed_features])
+        if use_sklearn:
+            distances, indices = _sklearn_kneighbors(feature_matrix, seed_features, n_neighbors, metric)
+        else:
+            distances, indices = top_k(feature_matrix, seed_features, n_neighbors,
+                                       weights=feature_weights, metric=metric)
         
         # Get similar tracks (skip index 0 which is the seed track)
         similar_tracks = []
@@ -396,10 +549,162 @@ def find_similar_tracks(sp, current_track_id):
                 similar_tracks.append((track['uri'], track['name'], track['artist']))
                 
         print(f"✅ Found {len(similar_tracks)} similar tracks using enhanced audio feature analysis")
+        cache_stats = get_default_cache().stats()
+        print(f"📦 Metadata cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+              f"({cache_stats['hit_rate']:.0%} hit rate, {cache_stats['entries']} entries)")
+        pool_stats = get_shared_search_pool().stats()
+        print(f"📦 Search pool: {pool_stats['hits']} queries reused, {pool_stats['misses']} missed "
+              f"({pool_stats['queries']} pooled)")
         return similar_tracks[:6]  # Return top 6
 
     except Exception as e:
         print(f"❌ Error in find_similar_tracks: {e}")
         import traceback
         traceback.print_exc()
-        return []
\ No newline at end of file
+        return []
+
+
+def _batch_search_queries(sp, seed_tracks):
+    """
+    Search queries shared by all seeds: each distinct seed artist once, a few
+    related artists per seed artist, and the generic queries once for the batch.
+    """
+    seed_artists = []
+    for track in seed_tracks:
+        artist = track['artists'][0] if track.get('artists') else None
+        if artist and artist not in seed_artists:
+            seed_artists.append(artist)
+    seed_artists = seed_artists[:MAX_BATCH_SEED_ARTISTS]
+    
+    queries = [f"artist:{artist['name']}" for artist in seed_artists]
+    seen = {artist['id'] for artist in seed_artists}
+    for artist in seed_artists:
+        try:
+            related = get_related_artists(sp, artist['id'])
+        except:
+            continue
+        for other in [a for a in related if a['id'] not in seen][:BATCH_RELATED_ARTISTS]:
+            seen.add(other['id'])
+            queries.append(f'artist:"{other["name"]}"')
+    
+    return queries + ["year:2020-2024", "genre:pop", "genre:rock", "genre:electronic",
+                      "year:2018-2024", "year:2015-2022"]
+
+
+def _round_robin(indices, count):
+    """Take each seed's next-nearest candidate in turn, skipping ones already taken."""
+    picked = []
+    taken = set()
+    for rank in range(indices.shape[1]):
+        for seed_neighbours in indices:
+            idx = int(seed_neighbours[rank])
+            if idx not in taken:
+                taken.add(idx)
+                picked.append(idx)
+                if len(picked) == count:
+                    return picked
+    return picked
+
+
+def find_similar_tracks_batch(sp, seed_track_ids, count=10, aggregation='round_robin',
+                              search_concurrency=None, metric='euclidean', feature_weights=None,
+                              should_stop=None):
+    """
+    Recommendations for several seeds at once ("radio from my last 10 tracks").
+    All seeds share one candidate search, one feature matrix and one batched
+    top-k query, so the cost grows far slower than calling find_similar_tracks
+    once per seed. Results exclude the seeds and never repeat a track.
+
+    aggregation='round_robin' interleaves each seed's nearest candidates;
+    'centroid' ranks candidates against the mean of the seed vectors.
+    Returns up to `count` (uri, name, artist) tuples, or None if should_stop fired.
+    """
+    if aggregation not in BATCH_AGGREGATIONS:
+        raise ValueError(f"Unknown aggregation '{aggregation}', expected one of {BATCH_AGGREGATIONS}")
+    should_stop = should_stop or (lambda: False)
+    seed_track_ids = list(dict.fromkeys(seed_track_ids))
+    if not seed_track_ids:
+        return []
+    
+    try:
+        print(f"🔍 Analyzing audio features for {len(seed_track_ids)} seed tracks...")
+        ensure_valid_token(sp)
+        
+        try:
+            found = get_tracks(sp, seed_track_ids)
+        except Exception as e:
+            print(f"❌ Error getting seed tracks: {e}")
+            return []
+        seed_tracks = [found[i] for i in seed_track_ids if found.get(i)]
+        if not seed_tracks:
+            print("❌ Could not get track information.")
+            return []
+        if should_stop():
+            return None
+        
+        # With a synced library the seed features are needed up front to pick local
+        # candidates; otherwise they go through the estimator with the candidates
+        seed_matrix = None
+        if _library_available():
+            seed_matrix, seed_valid, seed_stored = _feature_rows(sp, seed_tracks)
+            seed_matrix = seed_matrix[seed_valid]
+        
+        print("🔍 Searching for candidate tracks...")
+        target = min(MAX_BATCH_POOL, CANDIDATE_POOL_TARGET + BATCH_POOL_PER_SEED * (len(seed_tracks) - 1))
+        with SearchFanOut(sp, target=target, exclude_ids=set(seed_track_ids),
+                          max_workers=search_concurrency, should_stop=should_stop) as fan_out:
+            if seed_matrix is not None:
+                fan_out.add(_library_candidates(seed_track_ids, seed_matrix,
+                                                min(LOCAL_CANDIDATES * len(seed_tracks), target // 2)))
+            for query in _batch_search_queries(sp, seed_tracks):
+                fan_out.submit(query)
+            candidates = fan_out.collect()
+        
+        if should_stop():
+            return None
+        if len(candidates) < 10:
+            print("❌ Could not find enough tracks for comparison.")
+            return []
+        print(f"📊 Found {len(candidates)} candidate tracks for {len(seed_tracks)} seeds")
+        
+        # All candidates (and the seeds, if not done yet) go through the store/estimator in one pass
+        if seed_matrix is None:
+            feature_matrix, valid, seed_stored = _feature_rows(sp, seed_tracks + candidates)
+            seed_matrix = feature_matrix[:len(seed_tracks)][valid[:len(seed_tracks)]]
+            candidate_matrix, candidate_valid = feature_matrix[len(seed_tracks):], valid[len(seed_tracks):]
+            stored = 0
+        else:
+            candidate_matrix, candidate_valid, stored = _feature_rows(sp, candidates)
+        if not len(seed_matrix) or candidate_valid.sum() < count:
+            print("❌ Not enough features for authentic recommendations.")
+            return []
+        
+        candidate_matrix = candidate_matrix[candidate_valid]
+        candidates = [t for t, ok in zip(candidates, candidate_valid) if ok]
+        print(f"✅ Got enhanced features for {len(seed_matrix)} seeds and {len(candidates)} "
+              f"candidates ({seed_stored + stored} from the feature store)")
+        
+        print(f"🧠 Running batched KNN analysis ({aggregation})...")
+        if aggregation == 'centroid':
+            _, indices = top_k(candidate_matrix, seed_matrix.mean(axis=0), count,
+                               weights=feature_weights, metric=metric)
+            picked = indices[0].tolist()
+        else:
+            # `count` neighbours per seed always leave enough distinct tracks to interleave
+            _, indices = top_k(candidate_matrix, seed_matrix, count,
+                               weights=feature_weights, metric=metric)
+            picked = _round_robin(indices, count)
+        
+        similar_tracks = []
+        for idx in picked:
+            entry = _track_entry(candidates[idx], {})
+            similar_tracks.append((entry['uri'], entry['name'], entry['artist']))
+        
+        print(f"✅ Found {len(similar_tracks)} similar tracks for {len(seed_matrix)} seeds")
+        return similar_tracks
+    
+    except Exception as e:
+        print(f"❌ Error in find_similar_tracks_batch: {e}")
+        import traceback
+        traceback.print_exc()
+        return []
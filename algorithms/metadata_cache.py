@@ -0,0 +1,216 @@
+# algorithms/metadata_cache.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_DIR = os.getenv("ASHDJ_CACHE_DIR", ".ashdj_cache")
+
+# How long each kind of entity stays fresh (seconds). Track metadata is
+# practically immutable; artist popularity/followers drift, so they expire sooner.
+# "query" maps a normalized song query to the track it resolved to.
+DEFAULT_TTLS = {
+    "track": 7 * 24 * 3600,
+    "artist": 24 * 3600,
+    "related_artists": 24 * 3600,
+    "query": int(os.getenv("ASHDJ_QUERY_TTL", str(24 * 3600))),
+}
+
+DEFAULT_MAX_ENTRIES = 20000
+
+# Spotify's multi-ID endpoints accept at most 50 IDs per call.
+MAX_IDS_PER_CALL = 50
+
+
+class MetadataCache:
+    """
+    On-disk (SQLite) cache for Spotify metadata with per-kind TTLs,
+    a size limit and least-recently-used eviction.
+    """
+
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES, ttls=None):
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, "metadata.sqlite")
+
+        self.path = path
+        self.max_entries = max_entries
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                kind TEXT NOT NULL,
+                id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (kind, id)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_used)")
+        self._count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def get(self, kind, entity_id):
+        """Return the cached payload, or None on a miss or an expired entry."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, stored_at FROM entries WHERE kind = ? AND id = ?",
+                (kind, entity_id)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            payload, stored_at = row
+            if now - stored_at > self.ttls.get(kind, DEFAULT_TTLS["artist"]):
+                self._conn.execute("DELETE FROM entries WHERE kind = ? AND id = ?", (kind, entity_id))
+                self._count -= 1
+                self.expired += 1
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE entries SET last_used = ? WHERE kind = ? AND id = ?",
+                (now, kind, entity_id)
+            )
+            self.hits += 1
+
+        return json.loads(payload)
+
+    def put(self, kind, entity_id, payload):
+        """Store a payload, evicting the least recently used entries if over the limit."""
+        if not entity_id or payload is None:
+            return
+
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE entries SET payload = ?, stored_at = ?, last_used = ? WHERE kind = ? AND id = ?",
+                (json.dumps(payload), now, now, kind, entity_id)
+            )
+            if cursor.rowcount == 0:
+                self._conn.execute(
+                    "INSERT INTO entries (kind, id, payload, stored_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                    (kind, entity_id, json.dumps(payload), now, now)
+                )
+                self._count += 1
+
+            if self._count > self.max_entries:
+                self._evict(self._count - self.max_entries)
+
+    def _evict(self, n):
+        self._conn.execute(
+            "DELETE FROM entries WHERE rowid IN "
+            "(SELECT rowid FROM entries ORDER BY last_used ASC LIMIT ?)",
+            (n,)
+        )
+        self._count -= n
+        self.evictions += n
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._count = 0
+
+    def stats(self):
+        """Hit/miss counters for checking the cache is doing its job."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._count,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """Process-wide cache, created on first use. Falls back to memory if the disk store fails."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            try:
+                _default_cache = MetadataCache()
+            except (sqlite3.Error, OSError) as e:
+                print(f"⚠️  Metadata cache unavailable on disk ({e}), using in-memory cache")
+                _default_cache = MetadataCache(path=":memory:")
+        return _default_cache
+
+
+def get_track(sp, track_id, cache=None):
+    """sp.track() behind the metadata cache."""
+    cache = cache or get_default_cache()
+    track = cache.get("track", track_id)
+    if track is None:
+        track = sp.track(track_id)
+        cache.put("track", track_id, track)
+    return track
+
+
+def get_artist(sp, artist_id, cache=None):
+    """sp.artist() behind the metadata cache."""
+    cache = cache or get_default_cache()
+    artist = cache.get("artist", artist_id)
+    if artist is None:
+        artist = sp.artist(artist_id)
+        cache.put("artist", artist_id, artist)
+    return artist
+
+
+def get_related_artists(sp, artist_id, cache=None):
+    """sp.artist_related_artists() behind the metadata cache. Returns the list of artists."""
+    cache = cache or get_default_cache()
+    related = cache.get("related_artists", artist_id)
+    if related is None:
+        related = sp.artist_related_artists(artist_id).get('artists', [])
+        cache.put("related_artists", artist_id, related)
+    return related
+
+
+def _get_many(kind, ids, fetch_batch, cache=None):
+    cache = cache or get_default_cache()
+    results = {}
+    missing = []
+    for entity_id in dict.fromkeys(i for i in ids if i):
+        cached = cache.get(kind, entity_id)
+        if cached is None:
+            missing.append(entity_id)
+        else:
+            results[entity_id] = cached
+
+    for start in range(0, len(missing), MAX_IDS_PER_CALL):
+        chunk = missing[start:start + MAX_IDS_PER_CALL]
+        for entity in fetch_batch(chunk):
+            if entity and entity.get("id"):
+                cache.put(kind, entity["id"], entity)
+                results[entity["id"]] = entity
+
+    return results
+
+
+def get_tracks(sp, track_ids, cache=None):
+    """Resolve many track IDs with cached entries first and sp.tracks() for the rest. Returns {id: track}."""
+    return _get_many("track", track_ids, lambda chunk: sp.tracks(chunk).get("tracks", []), cache)
+
+
+def get_artists(sp, artist_ids, cache=None):
+    """Resolve many artist IDs with cached entries first and sp.artists() for the rest. Returns {id: artist}."""
+    return _get_many("artist", artist_ids, lambda chunk: sp.artists(chunk).get("artists", []), cache)
@@ -0,0 +1,86 @@
+# algorithms/mood_engine.py
+
+import numpy as np
+
+from algorithms.feature_estimator import AUDIO_FEATURES, FEATURE_INDEX
+from algorithms.feature_store import get_default_store
+from algorithms.similarity import distances
+
+# Each mood is a target point in feature space (all features are 0-1). Only the
+# listed features count towards the distance; the rest don't define the mood.
+# `key` and `mode` are never listed: the estimator derives them from a hash of
+# the track's ID / name, so they carry no musical signal.
+MOOD_CENTROIDS = {
+    'sad': {'valence': 0.15, 'energy': 0.3, 'danceability': 0.35, 'acousticness': 0.65,
+            'tempo': 0.4},
+    'happy': {'valence': 0.85, 'energy': 0.7, 'danceability': 0.7, 'tempo': 0.6},
+    'romantic': {'valence': 0.55, 'energy': 0.4, 'danceability': 0.5, 'acousticness': 0.5,
+                 'speechiness': 0.05, 'tempo': 0.45},
+    'dance': {'danceability': 0.9, 'energy': 0.85, 'valence': 0.7, 'tempo': 0.65,
+              'acousticness': 0.05},
+    'chill': {'energy': 0.25, 'acousticness': 0.6, 'instrumentalness': 0.5, 'tempo': 0.4,
+              'loudness': 0.35, 'speechiness': 0.05},
+}
+
+# Valence and energy separate moods best, so they count double
+FEATURE_EMPHASIS = {'valence': 2.0, 'energy': 2.0}
+
+# Below this many stored tracks the local pick would be too repetitive; search instead
+MIN_LOCAL_TRACKS = 25
+
+# Tracks are sampled from this many times `count` nearest, closer ones more likely
+NEIGHBOURHOOD_FACTOR = 6
+
+# Softmax temperature over distances: lower = stick closer to the centroid
+SAMPLING_TEMPERATURE = 0.1
+
+MOOD_VECTORS = {}
+MOOD_WEIGHTS = {}
+for _mood, _targets in MOOD_CENTROIDS.items():
+    MOOD_VECTORS[_mood] = np.zeros(len(AUDIO_FEATURES))
+    MOOD_WEIGHTS[_mood] = np.zeros(len(AUDIO_FEATURES))
+    for _feature, _value in _targets.items():
+        MOOD_VECTORS[_mood][FEATURE_INDEX[_feature]] = _value
+        MOOD_WEIGHTS[_mood][FEATURE_INDEX[_feature]] = FEATURE_EMPHASIS.get(_feature, 1.0)
+
+
+def rank_by_mood(mood, matrix):
+    """Weighted distance of every row of `matrix` to the mood's centroid (one vectorized pass)."""
+    return distances(matrix, MOOD_VECTORS[mood], weights=MOOD_WEIGHTS[mood])[0]
+
+
+def sample_near(dist, count, rng=None):
+    """
+    Pick `count` distinct row indices from the nearest rows, weighting each by
+    exp(-distance / T) so close tracks dominate but repeat requests still vary.
+    """
+    rng = rng or np.random.default_rng()
+    count = min(count, len(dist))
+    if count <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    pool = min(len(dist), count * NEIGHBOURHOOD_FACTOR)
+    nearest = np.argpartition(dist, pool - 1)[:pool] if pool < len(dist) else np.arange(len(dist))
+    logits = -(dist[nearest] - dist[nearest].min()) / SAMPLING_TEMPERATURE
+    probabilities = np.exp(logits)
+    probabilities /= probabilities.sum()
+    return rng.choice(nearest, size=count, replace=False, p=probabilities)
+
+
+def pick_mood_tracks(mood, count=5, store=None, rng=None):
+    """
+    URIs of `count` locally known tracks that fit the mood, from the feature
+    store. Returns None when the mood is unknown or too few tracks are stored,
+    so the caller can fall back to a search.
+    """
+    if mood not in MOOD_CENTROIDS:
+        return None
+    if store is None:
+        store = get_default_store()
+    if store is None or len(store) < max(MIN_LOCAL_TRACKS, count):
+        return None
+
+    track_ids, matrix = store.snapshot()
+
+    chosen = sample_near(rank_by_mood(mood, matrix), count, rng=rng)
+    return [f"spotify:track:{track_ids[i]}" for i in chosen]
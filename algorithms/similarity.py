@@ -0,0 +1,58 @@
+# algorithms/similarity.py
+
+import numpy as np
+
+METRICS = ("euclidean", "cosine")
+
+
+def _weighted(matrix, weights):
+    matrix = np.asarray(matrix, dtype=np.float64)
+    if weights is None:
+        return matrix
+    # Scaling each column by sqrt(w) makes plain distances equal to weighted ones
+    return matrix * np.sqrt(np.asarray(weights, dtype=np.float64))
+
+
+def distances(matrix, queries, weights=None, metric="euclidean"):
+    """
+    Full (n_queries x n_rows) distance matrix between query vectors and rows.
+    Euclidean uses the |q|^2 + |x|^2 - 2 q.x expansion; cosine returns 1 - cos similarity.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric '{metric}', expected one of {METRICS}")
+
+    X = _weighted(matrix, weights)
+    Q = _weighted(np.atleast_2d(queries), weights)
+
+    if metric == "cosine":
+        X_norm = np.linalg.norm(X, axis=1)
+        Q_norm = np.linalg.norm(Q, axis=1)
+        X_norm[X_norm == 0] = 1.0
+        Q_norm[Q_norm == 0] = 1.0
+        return 1.0 - (Q @ X.T) / np.outer(Q_norm, X_norm)
+
+    squared = (Q * Q).sum(axis=1)[:, None] + (X * X).sum(axis=1)[None, :] - 2.0 * (Q @ X.T)
+    return np.sqrt(np.maximum(squared, 0.0))
+
+
+def top_k(matrix, queries, k, weights=None, metric="euclidean"):
+    """
+    k nearest rows of `matrix` for every query vector.
+    Returns (distances, indices), both n_queries x k and sorted nearest first,
+    like sklearn's kneighbors() but without building a tree.
+    """
+    D = distances(matrix, queries, weights=weights, metric=metric)
+    k = min(k, D.shape[1])
+    if k <= 0:
+        empty = np.empty((D.shape[0], 0))
+        return empty, empty.astype(np.int64)
+
+    # argpartition finds the k smallest in O(n); only those k get sorted
+    if k < D.shape[1]:
+        candidates = np.argpartition(D, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.tile(np.arange(D.shape[1]), (D.shape[0], 1))
+    candidate_distances = np.take_along_axis(D, candidates, axis=1)
+    order = np.argsort(candidate_distances, axis=1, kind="stable")
+    return (np.take_along_axis(candidate_distances, order, axis=1),
+            np.take_along_axis(candidates, order, axis=1))
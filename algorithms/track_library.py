@@ -0,0 +1,237 @@
+# algorithms/track_library.py
+
+import json
+import os
+import sqlite3
+import threading
+
+from algorithms.metadata_cache import CACHE_DIR
+
+# Track fields kept locally: enough to play a track, show it and estimate its features
+TRACK_FIELDS = ("id", "uri", "name", "popularity", "duration_ms", "explicit")
+ALBUM_FIELDS = ("id", "uri", "name", "release_date", "release_date_precision")
+
+# Where a track came from; playlists are "playlist:<id>", top tracks "top:<time_range>"
+SAVED_SOURCE = "saved"
+
+
+def slim_track(track):
+    """The parts of a full Spotify track object worth storing (drops markets, images, ...)."""
+    slim = {field: track[field] for field in TRACK_FIELDS if field in track}
+    slim["artists"] = [{"id": a.get("id"), "name": a.get("name"), "uri": a.get("uri")}
+                       for a in track.get("artists", [])]
+    album = track.get("album") or {}
+    slim["album"] = {field: album[field] for field in ALBUM_FIELDS if field in album}
+    return slim
+
+
+class TrackLibrary:
+    """
+    The user's own tracks (saved, top and playlist tracks) in SQLite, so
+    lookups and candidate selection don't need the Web API.
+
+    Tracks are stored once; `track_sources` records every source each
+    one appears in. Name lookups go through precomputed `name_key` /
+    `artist_key` columns, which the caller fills in with the same
+    normalization it later queries with. `version` goes up whenever the
+    set of tracks may have changed, so derived data can be cached against it.
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, "library.sqlite")
+
+        self.path = path
+        self.version = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS tracks (
+                id TEXT PRIMARY KEY,
+                name_key TEXT NOT NULL,
+                artist_key TEXT NOT NULL,
+                artist_id TEXT,
+                popularity INTEGER NOT NULL DEFAULT 0,
+                payload TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS tracks_name ON tracks (name_key, artist_key);
+            CREATE INDEX IF NOT EXISTS tracks_artist ON tracks (artist_id);
+
+            CREATE TABLE IF NOT EXISTS track_sources (
+                source TEXT NOT NULL,
+                track_id TEXT NOT NULL,
+                added_at TEXT,
+                PRIMARY KEY (source, track_id)
+            );
+            CREATE INDEX IF NOT EXISTS track_sources_track ON track_sources (track_id);
+
+            CREATE TABLE IF NOT EXISTS playlists (
+                id TEXT PRIMARY KEY,
+                name TEXT,
+                snapshot_id TEXT
+            );
+
+            CREATE TABLE IF NOT EXISTS sync_state (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+
+    def add_tracks(self, tracks, name_keys, artist_keys):
+        """Insert or refresh tracks; keys are aligned with `tracks`."""
+        rows = []
+        for track, name_key, artist_key in zip(tracks, name_keys, artist_keys):
+            artists = track.get("artists") or [{}]
+            rows.append((track["id"], name_key, artist_key, artists[0].get("id"),
+                         track.get("popularity", 0), json.dumps(slim_track(track))))
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tracks (id, name_key, artist_key, artist_id, popularity, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            self.version += 1
+
+    def add_to_source(self, source, entries):
+        """Record (track_id, added_at) pairs as belonging to `source`."""
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO track_sources (source, track_id, added_at) VALUES (?, ?, ?)",
+                [(source, track_id, added_at) for track_id, added_at in entries]
+            )
+
+    def replace_source(self, source, entries):
+        """Make `entries` the complete contents of `source`."""
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM track_sources WHERE source = ?", (source,))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO track_sources (source, track_id, added_at) VALUES (?, ?, ?)",
+                [(source, track_id, added_at) for track_id, added_at in entries]
+            )
+
+    def source_count(self, source):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM track_sources WHERE source = ?", (source,)
+            ).fetchone()[0]
+
+    def playlist_snapshots(self):
+        """{playlist id: snapshot_id} as of the last sync."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT id, snapshot_id FROM playlists"))
+
+    def set_playlist(self, playlist_id, name, snapshot_id, entries):
+        """Replace a playlist's tracks and remember the snapshot they belong to."""
+        source = f"playlist:{playlist_id}"
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM track_sources WHERE source = ?", (source,))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO track_sources (source, track_id, added_at) VALUES (?, ?, ?)",
+                [(source, track_id, added_at) for track_id, added_at in entries]
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO playlists (id, name, snapshot_id) VALUES (?, ?, ?)",
+                (playlist_id, name, snapshot_id)
+            )
+
+    def remove_playlists(self, playlist_ids):
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            for playlist_id in playlist_ids:
+                self._conn.execute("DELETE FROM track_sources WHERE source = ?", (f"playlist:{playlist_id}",))
+                self._conn.execute("DELETE FROM playlists WHERE id = ?", (playlist_id,))
+
+    def prune(self):
+        """
+        Drop tracks that no longer belong to any source. Returns how many were
+        removed. Called last in a sync, so it always bumps `version`.
+        """
+        with self._lock:
+            self.version += 1
+            return self._conn.execute(
+                "DELETE FROM tracks WHERE id NOT IN (SELECT track_id FROM track_sources)"
+            ).rowcount
+
+    def get_state(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_state(self, key, value):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value))
+
+    def find(self, name_key, artist_key=None):
+        """Most popular stored track with this name (and artist), or None."""
+        sql = "SELECT payload FROM tracks WHERE name_key = ?"
+        params = [name_key]
+        if artist_key:
+            sql += " AND artist_key = ?"
+            params.append(artist_key)
+        with self._lock:
+            row = self._conn.execute(sql + " ORDER BY popularity DESC LIMIT 1", params).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def track_ids(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT id FROM tracks")]
+
+    def tracks(self, track_ids):
+        """{id: track} for the stored ones among track_ids."""
+        found = {}
+        track_ids = list(track_ids)
+        with self._lock:
+            for start in range(0, len(track_ids), 500):
+                chunk = track_ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for track_id, payload in self._conn.execute(
+                        f"SELECT id, payload FROM tracks WHERE id IN ({placeholders})", chunk):
+                    found[track_id] = json.loads(payload)
+        return found
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+
+    def stats(self):
+        with self._lock:
+            sources = dict(self._conn.execute(
+                "SELECT CASE WHEN source LIKE 'playlist:%' THEN 'playlists' "
+                "WHEN source LIKE 'top:%' THEN 'top' ELSE source END AS kind, COUNT(*) "
+                "FROM track_sources GROUP BY kind"
+            ))
+            playlists = self._conn.execute("SELECT COUNT(*) FROM playlists").fetchone()[0]
+            tracks = self._conn.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+        return {"tracks": tracks, "playlists": playlists,
+                "saved": sources.get(SAVED_SOURCE, 0), "top": sources.get("top", 0),
+                "playlist_entries": sources.get("playlists", 0)}
+
+    def close(self):
+        self._conn.close()
+
+
+_default_library = None
+_default_library_failed = False
+_default_library_lock = threading.Lock()
+
+
+def get_default_library():
+    """
+    Process-wide library, opened on first use. Returns None if it can't be
+    opened; that is only tried (and reported) once.
+    """
+    global _default_library, _default_library_failed
+    with _default_library_lock:
+        if _default_library is None and not _default_library_failed:
+            try:
+                _default_library = TrackLibrary()
+            except (sqlite3.Error, OSError) as e:
+                _default_library_failed = True
+                print(f"⚠️  Local track library unavailable ({e})")
+        return _default_library
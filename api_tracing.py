@@ -0,0 +1,191 @@
+"""
+Spotify API Tracing
+===================
+Wraps the spotipy client to record, per command and endpoint, how many calls
+were made, how long they took, how many failed or were retried and how many
+bytes came back. `stats` prints the table; ASHDJ_API_TRACE_FILE dumps it as
+JSON when the app exits.
+"""
+
+import atexit
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+TRACING_ENABLED = os.getenv("ASHDJ_API_TRACING", "1") != "0"
+TRACE_FILE = os.getenv("ASHDJ_API_TRACE_FILE")
+
+# Latency histogram bucket upper bounds (ms); the last bucket is everything slower
+LATENCY_BUCKETS_MS = [25, 50, 100, 250, 500, 1000, 2500]
+
+# The command whose work is running in this context (see command_scope)
+_current_command = contextvars.ContextVar("ashdj_api_command", default="(background)")
+
+# The wrapped call in progress on this thread, so the HTTP hook can credit it
+_active = threading.local()
+
+
+@contextmanager
+def command_scope(name):
+    """Attribute Spotify calls made inside the block (and its copied contexts) to `name`."""
+    token = _current_command.set(name)
+    try:
+        yield
+    finally:
+        _current_command.reset(token)
+
+
+class ApiTracer:
+    """Thread-safe counters keyed by (command, endpoint)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.started = time.time()
+
+    def _entry(self, command, endpoint):
+        key = (command, endpoint)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = {
+                "calls": 0, "errors": 0, "retries": 0, "bytes": 0, "total_ms": 0.0,
+                "max_ms": 0.0, "histogram": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+            }
+        return entry
+
+    def record(self, command, endpoint, seconds, error=False, received=0, retries=0):
+        ms = seconds * 1000
+        bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if ms <= bound),
+                      len(LATENCY_BUCKETS_MS))
+        with self._lock:
+            entry = self._entry(command, endpoint)
+            entry["calls"] += 1
+            entry["errors"] += int(error)
+            entry["retries"] += retries
+            entry["bytes"] += received
+            entry["total_ms"] += ms
+            entry["max_ms"] = max(entry["max_ms"], ms)
+            entry["histogram"][bucket] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {key: dict(entry, histogram=list(entry["histogram"]))
+                    for key, entry in self._entries.items()}
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+            self.started = time.time()
+
+    def to_json(self):
+        return {
+            "started": self.started,
+            "latency_buckets_ms": LATENCY_BUCKETS_MS,
+            "entries": [dict(entry, command=command, endpoint=endpoint)
+                        for (command, endpoint), entry in sorted(self.snapshot().items())],
+        }
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_json(), f, indent=2)
+
+    def report(self, output_func=print):
+        entries = self.snapshot()
+        if not entries:
+            output_func("📊 No Spotify API calls recorded yet.")
+            return
+
+        by_command = {}
+        for (command, endpoint), entry in entries.items():
+            by_command.setdefault(command, []).append((endpoint, entry))
+
+        output_func(f"📊 Spotify API calls since {time.strftime('%H:%M:%S', time.localtime(self.started))}:")
+        for command, rows in sorted(by_command.items(), key=lambda item: -sum(e["calls"] for _, e in item[1])):
+            output_func(f"  {command}: {sum(e['calls'] for _, e in rows)} calls")
+            for endpoint, e in sorted(rows, key=lambda row: -row[1]["calls"]):
+                line = (f"    {endpoint:<24} {e['calls']:>5} calls  avg {e['total_ms'] / e['calls']:7.1f} ms  "
+                        f"max {e['max_ms']:7.1f} ms  {e['bytes'] / 1024:8.1f} KB")
+                if e["errors"]:
+                    line += f"  {e['errors']} errors"
+                if e["retries"]:
+                    line += f"  {e['retries']} retries"
+                output_func(line)
+
+
+api_tracer = ApiTracer()
+
+
+def _on_response(response, *args, **kwargs):
+    """requests response hook: credit bytes received and urllib3 retries to the active call."""
+    call = getattr(_active, "call", None)
+    if call is None:
+        return
+    length = response.headers.get("Content-Length")
+    call["bytes"] += int(length) if length and length.isdigit() else len(response.content or b"")
+    retries = getattr(getattr(response, "raw", None), "retries", None)
+    if retries is not None and getattr(retries, "history", None):
+        call["retries"] += len(retries.history)
+    if response.status_code == 429:
+        call["retries"] += 1  # The session layer waits out Retry-After and re-sends
+
+
+class TracedSpotify:
+    """
+    Proxy for a spotipy.Spotify: public methods are timed and recorded under
+    the current command; everything else passes straight through.
+    """
+
+    def __init__(self, sp, tracer=api_tracer):
+        self._sp = sp
+        self._tracer = tracer
+        self._wrapped = {}
+        session = getattr(sp, "_session", None)
+        if session is not None and hasattr(session, "hooks"):
+            session.hooks.setdefault("response", []).append(_on_response)
+
+    def __getattr__(self, name):
+        attr = getattr(self._sp, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        wrapped = self._wrapped.get(name)
+        if wrapped is None:
+            wrapped = self._wrapped[name] = self._wrap(name)
+        return wrapped
+
+    def _wrap(self, endpoint):
+        def traced(*args, **kwargs):
+            outer = getattr(_active, "call", None)
+            call = _active.call = {"bytes": 0, "retries": 0}
+            error = False
+            start = time.perf_counter()
+            try:
+                return getattr(self._sp, endpoint)(*args, **kwargs)
+            except Exception:
+                error = True
+                raise
+            finally:
+                _active.call = outer
+                self._tracer.record(_current_command.get(), endpoint, time.perf_counter() - start,
+                                    error=error, received=call["bytes"], retries=call["retries"])
+        traced.__name__ = endpoint
+        return traced
+
+
+def trace_spotify(sp):
+    """Wrap sp for tracing (unless ASHDJ_API_TRACING=0) and arrange the exit dump if requested."""
+    if not TRACING_ENABLED:
+        return sp
+    if TRACE_FILE:
+        atexit.register(_dump_on_exit, TRACE_FILE)
+    return TracedSpotify(sp)
+
+
+def _dump_on_exit(path):
+    try:
+        api_tracer.dump(path)
+        print(f"📊 Spotify API trace written to {path}")
+    except Exception as e:
+        print(f"⚠️  Could not write API trace to {path}: {e}")
@@ -1,12 +1,32 @@
-import tkinter as tk
-from PIL import Image, ImageTk, ImageSequence
-import threading
-import speech_recognition as sr
-
-from spotify_api import authenticate_spotify
-from commands.menu import run_interactive_menu
-
-from elevenlabs_api import speak
+from startup import LAZY_STARTUP, startup_timer, warm_in_background
+
+with startup_timer.phase("import tkinter, PIL"):
+    import tkinter as tk
+    from PIL import ImageTk
+    import collections
+    import os
+    import threading
+    import time
+
+with startup_timer.phase("import spotify + command modules"):
+    from spotify_api import authenticate_spotify, has_cached_token, verify_connection
+    from commands.menu import run_interactive_menu
+    from commands.prefetch import get_prefetcher
+
+    from command_executor import CommandExecutor
+    from elevenlabs_api import speak, init_tts
+    from gif_frames import GifFramePipeline
+    from voice_capture import get_microphone_service
+
+# How often to check whether a hidden window is visible again, and how soon to
+# retry when the next GIF frame isn't decoded yet (ms)
+HIDDEN_POLL_MS = 250
+FRAME_RETRY_MS = 15
+
+# GIF frames kept as PhotoImages at once (~2.3 MB each at window size); the
+# rest are read back from the frame cache, GIF_LOOKAHEAD frames ahead of time
+GIF_PHOTO_WINDOW = max(1, int(os.getenv("ASHDJ_GIF_FRAMES", "8")))
+GIF_LOOKAHEAD = 2
 
 class AnimeTerminalApp:
     def __init__(self, root, sp):
@@ -34,57 +54,117 @@ class AnimeTerminalApp:
         self.root.bind("<Control-m>", lambda e: self.start_voice_thread())
         self.root.bind("<Control-M>", lambda e: self.start_voice_thread())  # Uppercase M
 
-        self.load_gif("assets/anime_girl.gif")
+        # Typed and spoken commands share one ordered worker instead of a thread each
+        self.executor = CommandExecutor(self.process_command)
+
+        # Start watching playback so "play something like this" is ready before it's asked
+        get_prefetcher(self.sp)
 
-    def load_gif(self, gif_path):
-        gif = Image.open(gif_path)
-        self.gif_frames = [
-            ImageTk.PhotoImage(frame.copy().convert("RGBA").resize(
-                (self.window_width, self.window_height), Image.LANCZOS))
-            for frame in ImageSequence.Iterator(gif)
-        ]
+        # Frames are decoded, scaled and cached off the main thread; the window shows immediately.
+        # Only the most recently shown GIF_PHOTO_WINDOW frames stay as PhotoImages (index -> (photo, delay)).
+        self.gif_photos = collections.OrderedDict()
         self.gif_index = 0
+        self.gif_shown = None
+        self.startup_reported = False
+        self.gif_pipeline = GifFramePipeline("assets/anime_girl.gif",
+                                             (self.window_width, self.window_height)).start()
         self.animate_gif()
 
     def animate_gif(self):
-        self.gif_label.config(image=self.gif_frames[self.gif_index])
-        self.gif_index = (self.gif_index + 1) % len(self.gif_frames)
-        self.root.after(100, self.animate_gif)
+        # Don't spend CPU on frames nobody can see (minimised/withdrawn window)
+        if not self.root.winfo_viewable():
+            self.root.after(HIDDEN_POLL_MS, self.animate_gif)
+            return
+
+        started = time.perf_counter()
+        count = self.gif_pipeline.frame_count()
+        if count == 0:
+            return  # Nothing could be decoded
+        if count:
+            self.gif_index %= count
+
+        self.receive_gif_frames()
+        frame = self.gif_photos.get(self.gif_index)
+        if frame is None:  # Not decoded or read back yet
+            if count:
+                self.gif_pipeline.request(self.gif_index)
+            self.root.after(FRAME_RETRY_MS, self.animate_gif)
+            return
+
+        self.gif_photos.move_to_end(self.gif_index)
+        photo, delay_ms = frame
+        if photo is not None:  # None: the frame couldn't be read back, skip it
+            # Keep a reference while it's on screen, even if it leaves the window, or Tk blanks it
+            self.gif_shown = photo
+            self.gif_label.config(image=photo)
+        self.gif_index += 1
+        if count:
+            for ahead in range(self.gif_index, self.gif_index + GIF_LOOKAHEAD):
+                if ahead % count not in self.gif_photos:
+                    self.gif_pipeline.request(ahead % count)
+
+        if not self.startup_reported:
+            self.startup_reported = True
+            startup_timer.report()
+
+        # Honour the GIF's own frame delay, minus the time spent converting frames
+        spent_ms = int((time.perf_counter() - started) * 1000)
+        self.root.after(max(1, delay_ms - spent_ms), self.animate_gif)
+
+    def receive_gif_frames(self):
+        """
+        Turn frames from the pipeline into PhotoImages, evicting the least
+        recently shown beyond GIF_PHOTO_WINDOW. One per tick while the frame
+        that's due is already there, so the conversions are spread out.
+        """
+        received = 0
+        while received == 0 or self.gif_index not in self.gif_photos:
+            next_frame = self.gif_pipeline.next_frame()
+            if next_frame is None:
+                return
+            index, image, delay_ms = next_frame
+            received += 1
+            self.gif_photos[index] = (ImageTk.PhotoImage(image) if image is not None else None, delay_ms)
+            self.gif_photos.move_to_end(index)
+            while len(self.gif_photos) > GIF_PHOTO_WINDOW:
+                self.gif_photos.popitem(last=False)
 
     def send_command(self, event):
         command = self.entry.get().strip()
         self.entry.delete(0, tk.END)
-        threading.Thread(target=self.process_command, args=(command,), daemon=True).start()
+        self.executor.submit(command, source="text")
 
     def process_command(self, command):
         run_interactive_menu(self.sp, single_command=command, output_func=lambda msg: None)
 
     def start_voice_thread(self):
-        """Start listening in a separate thread to avoid freezing UI"""
+        """Open the microphone on first use (off the UI thread), then arm it for one command"""
         threading.Thread(target=self.listen_voice, daemon=True).start()
 
     def listen_voice(self):
-        recognizer = sr.Recognizer()
-        with sr.Microphone() as source:
-            print("🎙 Listening for command...")
-            try:
-                audio = recognizer.listen(source, timeout=5, phrase_time_limit=7)
-                command = recognizer.recognize_google(audio)
-                print(f"✅ You said: {command}")
-                self.process_command(command)
-            except sr.UnknownValueError:
-                print("❌ Could not understand audio.")
-            except sr.RequestError:
-                print("❌ Speech recognition service unavailable.")
-            except sr.WaitTimeoutError:
-                print("⌛ Listening timed out.")
+        # One persistent stream + endpointer; repeated Ctrl+M presses just re-arm it
+        try:
+            voice = get_microphone_service(lambda command: self.executor.submit(command, source="voice"))
+        except Exception as e:
+            print(f"❌ Microphone unavailable: {e}")
+            return
+        voice.listen_once()
 
 
 def main():
     try:
-        sp = authenticate_spotify()
-        root = tk.Tk()
-        app = AnimeTerminalApp(root, sp)
+        with startup_timer.phase("authenticate Spotify"):
+            # Without a cached token the OAuth prompt has to happen up front
+            has_token = has_cached_token()
+            sp = authenticate_spotify(verify=not (LAZY_STARTUP and has_token))
+        if LAZY_STARTUP:
+            if has_token:
+                warm_in_background("Spotify connection check", lambda: verify_connection(sp))
+            warm_in_background("ElevenLabs client + mixer", init_tts)
+
+        with startup_timer.phase("create window"):
+            root = tk.Tk()
+            app = AnimeTerminalApp(root, sp)
         root.mainloop()
     except Exception as e:
         print(f"❌ Error initializing Spotify: {e}")
@@ -0,0 +1,74 @@
+# benchmarks/bench_batch_recommend.py
+#
+# API calls and wall time for recommending from N seeds: N separate
+# find_similar_tracks runs vs one find_similar_tracks_batch, offline against
+# FakeSpotify. Every run starts with a cold metadata cache and feature store.
+# Run from the repo root:  python -m benchmarks.bench_batch_recommend [seed counts...]
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import algorithms.knn_recommender as knn_recommender
+import algorithms.metadata_cache as metadata_cache
+import algorithms.track_library as track_library
+from algorithms.candidate_pool import get_shared_search_pool
+from algorithms.feature_store import FeatureStore
+from algorithms.knn_recommender import find_similar_tracks, find_similar_tracks_batch
+from benchmarks.fake_spotify import FakeSpotify
+from benchmarks.synthetic import generate_catalog
+
+SEED_COUNTS = [1, 2, 5, 10, 20]
+CATALOG_SIZE = 5_000
+
+
+@contextlib.contextmanager
+def _cold(tracks, artists):
+    """A FakeSpotify with an empty metadata cache, search pool, feature store and track library."""
+    saved = (metadata_cache._default_cache, knn_recommender.get_default_store, track_library._default_library)
+    with tempfile.TemporaryDirectory(prefix="ashdj-bench-") as tmp:
+        store = FeatureStore(directory=tmp)
+        library = track_library.TrackLibrary(path=os.path.join(tmp, "library.sqlite"))
+        metadata_cache._default_cache = metadata_cache.MetadataCache(path=":memory:")
+        get_shared_search_pool().clear()
+        knn_recommender.get_default_store = lambda: store
+        track_library._default_library = library
+        try:
+            yield FakeSpotify(tracks, artists)
+        finally:
+            (metadata_cache._default_cache, knn_recommender.get_default_store,
+             track_library._default_library) = saved
+            store.close()
+            library.close()
+
+
+def _measure(tracks, artists, fn):
+    with _cold(tracks, artists) as sp, contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        results = fn(sp)
+        return time.perf_counter() - start, sum(sp.calls.values()), results
+
+
+def run(seed_counts=SEED_COUNTS):
+    tracks, artists = generate_catalog(CATALOG_SIZE)
+    # Spread the seeds over the catalog so they have different artists
+    step = len(tracks) // max(seed_counts)
+
+    print(f"{'seeds':>5} | {'per-seed calls':>14} | {'batch calls':>11} | "
+          f"{'per-seed (ms)':>13} | {'batch (ms)':>10} | {'tracks':>6}")
+    print("-" * 76)
+    for n in seed_counts:
+        seeds = [tracks[i * step]['id'] for i in range(n)]
+        loop_time, loop_calls, _ = _measure(
+            tracks, artists, lambda sp: [find_similar_tracks(sp, seed) for seed in seeds])
+        batch_time, batch_calls, picked = _measure(
+            tracks, artists, lambda sp: find_similar_tracks_batch(sp, seeds, count=2 * n))
+        print(f"{n:>5} | {loop_calls:>14} | {batch_calls:>11} | "
+              f"{loop_time * 1000:>13.1f} | {batch_time * 1000:>10.1f} | {len(picked):>6}")
+
+
+if __name__ == "__main__":
+    run([int(arg) for arg in sys.argv[1:]] or SEED_COUNTS)
@@ -0,0 +1,46 @@
+# benchmarks/bench_feature_estimator.py
+#
+# Scalar (per-track dict) vs vectorized feature estimation.
+# Run from the repo root:  python -m benchmarks.bench_feature_estimator
+
+import sys
+import time
+
+import numpy as np
+
+from algorithms.feature_estimator import estimate_features_batch
+from algorithms.knn_recommender import extract_audio_features, get_enhanced_track_features
+from benchmarks.synthetic import generate_artists, generate_tracks
+
+SIZES = [100, 10_000, 100_000]
+
+
+def run(sizes=SIZES):
+    print(f"{'tracks':>8} | {'scalar (s)':>10} | {'batch (s)':>10} | {'speedup':>8} | identical")
+    print("-" * 58)
+    for n in sizes:
+        artists = generate_artists(max(10, n // 20))
+        artists_by_id = {a['id']: a for a in artists}
+        tracks = generate_tracks(n, artists)
+        track_artists = [artists_by_id[t['artists'][0]['id']] for t in tracks]
+
+        start = time.perf_counter()
+        scalar = np.array([
+            extract_audio_features(get_enhanced_track_features(None, t, artist_info=a))
+            for t, a in zip(tracks, track_artists)
+        ])
+        scalar_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch = estimate_features_batch(tracks, track_artists)
+        batch_time = time.perf_counter() - start
+
+        identical = np.array_equal(scalar, batch)
+        print(f"{n:>8} | {scalar_time:>10.4f} | {batch_time:>10.4f} | "
+              f"{scalar_time / batch_time:>7.1f}x | {'yes' if identical else 'NO'}")
+        if not identical:
+            print(f"   max abs difference: {np.abs(scalar - batch).max():.3g}")
+
+
+if __name__ == "__main__":
+    run([int(arg) for arg in sys.argv[1:]] or SIZES)
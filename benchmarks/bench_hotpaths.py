@@ -0,0 +1,220 @@
+# benchmarks/bench_hotpaths.py
+#
+# Time, peak memory and allocations for each stage of the recommender, run
+# offline against FakeSpotify at several catalog sizes. Results are written to
+# benchmarks/results/ and compared with the previous run.
+# Run from the repo root:  python -m benchmarks.bench_hotpaths [sizes...]
+
+import contextlib
+import datetime
+import glob
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import algorithms.knn_recommender as knn_recommender
+import algorithms.metadata_cache as metadata_cache
+import algorithms.track_library as track_library
+from algorithms.candidate_pool import get_shared_search_pool
+from algorithms.feature_estimator import estimate_features_batch
+from algorithms.feature_store import FeatureStore
+from algorithms.knn_recommender import (
+    build_enhanced_feature_matrix, extract_audio_features, find_similar_tracks,
+    get_enhanced_track_features,
+)
+from algorithms.similarity import top_k
+from benchmarks.fake_spotify import FakeSpotify
+from benchmarks.synthetic import generate_catalog
+
+SIZES = [100, 1_000, 10_000, 100_000]
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# A change in time or peak memory beyond this ratio is flagged in the comparison
+REGRESSION_THRESHOLD = 1.2
+
+
+class _Offline:
+    """Fresh in-memory metadata cache and throwaway feature store and track library for one stage run."""
+
+    def __init__(self, tracks, artists, seed_index=0):
+        self.sp = FakeSpotify(tracks, artists, current_track_id=tracks[seed_index]['id'])
+        self.seed_id = tracks[seed_index]['id']
+        self.tracks = tracks
+        self.artists = artists
+        self._tmp = tempfile.TemporaryDirectory(prefix="ashdj-bench-")
+        self.store = FeatureStore(directory=self._tmp.name)
+        self.library = track_library.TrackLibrary(path=os.path.join(self._tmp.name, "library.sqlite"))
+
+    def __enter__(self):
+        self._saved = (metadata_cache._default_cache, knn_recommender.get_default_store,
+                       knn_recommender.MAX_COMPARISON_TRACKS, track_library._default_library)
+        metadata_cache._default_cache = metadata_cache.MetadataCache(path=":memory:")
+        # Empty library, so results never depend on the user's synced one
+        track_library._default_library = self.library
+        get_shared_search_pool().clear()
+        knn_recommender.get_default_store = lambda: self.store
+        # Let build_enhanced_feature_matrix take the whole catalog, not just 40 candidates
+        knn_recommender.MAX_COMPARISON_TRACKS = len(self.tracks)
+        return self
+
+    def __exit__(self, *exc):
+        (metadata_cache._default_cache, knn_recommender.get_default_store,
+         knn_recommender.MAX_COMPARISON_TRACKS, track_library._default_library) = self._saved
+        self.store.close()
+        self.library.close()
+        self._tmp.cleanup()
+
+
+def _artists_for(tracks, artists):
+    by_id = {a['id']: a for a in artists}
+    return [by_id[t['artists'][0]['id']] for t in tracks]
+
+
+# Each stage: setup(offline) -> state, run(offline, state). Only run() is measured.
+
+def _scalar_setup(offline):
+    return _artists_for(offline.tracks, offline.artists)
+
+
+def _scalar_run(offline, track_artists):
+    return np.array([
+        extract_audio_features(get_enhanced_track_features(None, t, artist_info=a))
+        for t, a in zip(offline.tracks, track_artists)
+    ])
+
+
+def _batch_run(offline, track_artists):
+    return estimate_features_batch(offline.tracks, track_artists)
+
+
+def _build_warm_setup(offline):
+    build_enhanced_feature_matrix(offline.sp, offline.seed_id, offline.tracks)
+
+
+def _build_run(offline, state):
+    return build_enhanced_feature_matrix(offline.sp, offline.seed_id, offline.tracks)
+
+
+def _knn_setup(offline):
+    rng = np.random.default_rng(0)
+    return rng.random((len(offline.tracks), 11)).astype(np.float32)
+
+
+def _knn_run(offline, matrix):
+    return top_k(matrix, matrix[0], 6)
+
+
+def _find_similar_run(offline, state):
+    return find_similar_tracks(offline.sp, offline.seed_id)
+
+
+STAGES = [
+    ("get_enhanced_track_features+extract", _scalar_setup, _scalar_run),
+    ("estimate_features_batch", _scalar_setup, _batch_run),
+    ("build_enhanced_feature_matrix (cold)", lambda offline: None, _build_run),
+    ("build_enhanced_feature_matrix (warm)", _build_warm_setup, _build_run),
+    ("knn top_k", _knn_setup, _knn_run),
+    ("find_similar_tracks", lambda offline: None, _find_similar_run),
+]
+
+
+def _measure(tracks, artists, setup, run, repeats):
+    """Best wall time over `repeats` untraced runs, then one traced run for memory."""
+    best = float("inf")
+    calls = {}
+    for _ in range(repeats):
+        with _Offline(tracks, artists) as offline, contextlib.redirect_stdout(io.StringIO()):
+            state = setup(offline)
+            offline.sp.calls.clear()
+            start = time.perf_counter()
+            run(offline, state)
+            best = min(best, time.perf_counter() - start)
+            calls = dict(offline.sp.calls)
+
+    with _Offline(tracks, artists) as offline, contextlib.redirect_stdout(io.StringIO()):
+        state = setup(offline)
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        result = run(offline, state)
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        del result
+
+    new_blocks = sum(stat.count_diff for stat in after.compare_to(before, "lineno") if stat.count_diff > 0)
+    return {
+        "seconds": best,
+        "peak_kb": (peak - baseline) / 1024,
+        "retained_kb": (current - baseline) / 1024,
+        "allocated_blocks": new_blocks,
+        "api_calls": calls,
+    }
+
+
+def _previous_results():
+    paths = sorted(glob.glob(os.path.join(RESULTS_DIR, "hotpaths-*.json")))
+    if not paths:
+        return None, None
+    with open(paths[-1]) as f:
+        return paths[-1], json.load(f)
+
+
+def _compare(previous, results):
+    old = {(r["stage"], r["size"]): r for r in previous["results"]}
+    print(f"\nvs {previous['timestamp']}:")
+    print(f"{'stage':>38} | {'size':>7} | {'time':>7} | {'peak mem':>8}")
+    print("-" * 70)
+    for r in results:
+        o = old.get((r["stage"], r["size"]))
+        if o is None:
+            continue
+        time_ratio = r["seconds"] / o["seconds"] if o["seconds"] else float("nan")
+        peak_ratio = r["peak_kb"] / o["peak_kb"] if o["peak_kb"] else float("nan")
+        flag = "  ⚠️" if max(time_ratio, peak_ratio) > REGRESSION_THRESHOLD else ""
+        print(f"{r['stage']:>38} | {r['size']:>7} | {time_ratio:>6.2f}x | {peak_ratio:>7.2f}x{flag}")
+
+
+def run(sizes=SIZES):
+    results = []
+    print(f"{'stage':>38} | {'size':>7} | {'time (ms)':>10} | {'peak (KB)':>10} | "
+          f"{'blocks':>8} | api calls")
+    print("-" * 100)
+    for n in sizes:
+        tracks, artists = generate_catalog(n)
+        repeats = 5 if n <= 1_000 else (2 if n <= 10_000 else 1)
+        for name, setup, stage_run in STAGES:
+            m = _measure(tracks, artists, setup, stage_run, repeats)
+            results.append(dict(stage=name, size=n, **m))
+            calls = sum(m["api_calls"].values())
+            print(f"{name:>38} | {n:>7} | {m['seconds'] * 1000:>10.2f} | {m['peak_kb']:>10.0f} | "
+                  f"{m['allocated_blocks']:>8} | {calls}")
+
+    previous_path, previous = _previous_results()
+    report = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"hotpaths-{datetime.datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Saved results to {path}")
+
+    if previous is not None:
+        _compare(previous, results)
+
+
+if __name__ == "__main__":
+    run([int(arg) for arg in sys.argv[1:]] or SIZES)
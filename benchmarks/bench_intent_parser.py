@@ -0,0 +1,124 @@
+# benchmarks/bench_intent_parser.py
+#
+# Throughput of the compiled intent engine vs the old pattern-by-pattern
+# parser on a synthetic corpus, plus where (and why) their answers differ.
+# Run from the repo root:  python -m benchmarks.bench_intent_parser [n_utterances]
+
+import collections
+import random
+import re
+import sys
+import time
+
+from algorithms.intent_parser import IntentEngine, load_rules
+
+N_UTTERANCES = 100_000
+
+SONGS = ["blinding lights", "bohemian rhapsody", "shape of you", "levitating", "starboy",
+         "lose yourself", "bad guy", "take on me", "hotel california", "as it was",
+         "this song", "something in the way", "dancing queen", "blue in green", "moving on"]
+MOOD_WORDS = ["sad", "depressed", "blue", "happy", "joy", "cheerful", "romantic", "love",
+              "valentine", "dance", "party", "move", "chill", "relax", "lofi", "calm"]
+TEMPLATES = [
+    "play something like {song}", "play songs like {song}", "music like {song}",
+    "something like {song}", "play similar to {song}", "similar to {song}", "play like {song}",
+    "play {song}", "play {song} by the weekend", "Play {song} Please",
+    "play some {mood} music", "i feel {mood}", "put on something {mood}",
+    "i'm in a {mood} mood", "play {mood} songs",
+    "remove this from the queue", "i'd like to hear {song}", "play the blues",
+    "unlike yesterday play {song}", "lovely day", "pause", "next", "status", "play",
+]
+
+
+def legacy_parse_intent(user_input):
+    """The parser as it was before the intent engine, kept here for comparison."""
+    user_input = user_input.lower()
+
+    similar_patterns = [
+        r"play\s+(something\s+like|songs\s+like|music\s+like)\s+(.*)",
+        r"(something\s+like|songs\s+like|music\s+like)\s+(.*)",
+        r"play\s+(similar\s+to|like)\s+(.*)",
+        r"(similar\s+to|like)\s+(.*)"
+    ]
+
+    for pattern in similar_patterns:
+        match = re.search(pattern, user_input)
+        if match:
+            if len(match.groups()) >= 2:
+                track_query = match.group(2).strip()
+            else:
+                track_query = match.group(1).strip()
+
+            if track_query:
+                return {"intent": "play_similar", "track_query": track_query}
+
+    moods = {
+        "sad": ["sad", "depressed", "blue"],
+        "happy": ["happy", "joy", "cheerful"],
+        "romantic": ["romantic", "love", "valentine"],
+        "dance": ["dance", "party", "move"],
+        "chill": ["chill", "relax", "lofi", "calm"]
+    }
+
+    for mood, keywords in moods.items():
+        if any(word in user_input for word in keywords):
+            return {"intent": "play_mood", "mood": mood}
+
+    if user_input.startswith("play "):
+        return {"intent": "play_exact", "query": user_input[5:].strip()}
+
+    return {"intent": "unknown"}
+
+
+def generate_corpus(n, seed=0):
+    rnd = random.Random(seed)
+    return [rnd.choice(TEMPLATES).format(song=rnd.choice(SONGS), mood=rnd.choice(MOOD_WORDS))
+            for _ in range(n)]
+
+
+def _throughput(parse, corpus):
+    start = time.perf_counter()
+    results = [parse(utterance) for utterance in corpus]
+    return len(corpus) / (time.perf_counter() - start), results
+
+
+def run(n=N_UTTERANCES):
+    corpus = generate_corpus(n)
+    start = time.perf_counter()
+    engine = IntentEngine(load_rules())
+    print(f"engine compile: {(time.perf_counter() - start) * 1000:.2f} ms (paid once per process)\n")
+
+    legacy_rate, legacy_results = _throughput(legacy_parse_intent, corpus)
+    engine_rate, engine_results = _throughput(engine.parse, corpus)
+
+    print(f"{'parser':>8} | {'utterances/s':>12} | {'µs/utterance':>12}")
+    print("-" * 40)
+    print(f"{'legacy':>8} | {legacy_rate:>12,.0f} | {1e6 / legacy_rate:>12.2f}")
+    print(f"{'engine':>8} | {engine_rate:>12,.0f} | {1e6 / engine_rate:>12.2f}")
+    print(f"speedup: {engine_rate / legacy_rate:.1f}x\n")
+
+    print(f"{'intent':>14} | {'legacy':>8} | {'engine':>8}")
+    print("-" * 36)
+    legacy_counts = collections.Counter(r["intent"] for r in legacy_results)
+    engine_counts = collections.Counter(r["intent"] for r in engine_results)
+    for intent in sorted(set(legacy_counts) | set(engine_counts)):
+        print(f"{intent:>14} | {legacy_counts[intent]:>8} | {engine_counts[intent]:>8}")
+
+    differences = collections.Counter()
+    examples = {}
+    for utterance, old, new in zip(corpus, legacy_results, engine_results):
+        if old != new:
+            key = (old["intent"], new["intent"])
+            differences[key] += 1
+            examples.setdefault(key, utterance)
+
+    same = n - sum(differences.values())
+    print(f"\nidentical results: {same}/{n} ({same / n:.1%})")
+    if differences:
+        print("differences (word-boundary matching; legacy answer → engine answer):")
+        for (old, new), count in differences.most_common():
+            print(f"  {count:>6} × {old} → {new}, e.g. {examples[(old, new)]!r}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else N_UTTERANCES)
@@ -0,0 +1,56 @@
+# benchmarks/bench_similarity.py
+#
+# Latency of the top-k similarity engine vs fitting sklearn's NearestNeighbors
+# per query, as find_similar_tracks used to.
+# Run from the repo root:  python -m benchmarks.bench_similarity
+
+import sys
+import time
+
+import numpy as np
+
+from algorithms.feature_estimator import AUDIO_FEATURES
+from algorithms.similarity import top_k
+
+SIZES = [41, 1_000, 10_000, 100_000]
+REPEATS = 20
+
+
+def _time(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(sizes=SIZES, n_queries=10, k=6):
+    start = time.perf_counter()
+    from sklearn.neighbors import NearestNeighbors
+    import_time = time.perf_counter() - start
+    print(f"sklearn import: {import_time * 1000:.1f} ms (paid once per process)\n")
+
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>8} | {'queries':>7} | {'sklearn (ms)':>12} | {'top_k (ms)':>10} | {'speedup':>8} | same neighbours")
+    print("-" * 78)
+    for n in sizes:
+        matrix = rng.random((n, len(AUDIO_FEATURES)))
+        for queries in (matrix[:1], matrix[:n_queries]):
+            repeats = REPEATS if n <= 10_000 else 3
+
+            def with_sklearn():
+                knn = NearestNeighbors(n_neighbors=min(k, n), algorithm='auto', metric='euclidean')
+                knn.fit(matrix)
+                return knn.kneighbors(queries)
+
+            sk_time, (_, sk_indices) = _time(with_sklearn, repeats)
+            tk_time, (_, tk_indices) = _time(lambda: top_k(matrix, queries, k), repeats)
+
+            same = np.array_equal(np.sort(sk_indices, axis=1), np.sort(tk_indices, axis=1))
+            print(f"{n:>8} | {len(queries):>7} | {sk_time * 1000:>12.3f} | {tk_time * 1000:>10.3f} | "
+                  f"{sk_time / tk_time:>7.1f}x | {'yes' if same else 'NO'}")
+
+
+if __name__ == "__main__":
+    run([int(arg) for arg in sys.argv[1:]] or SIZES)
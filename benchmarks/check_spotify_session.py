@@ -0,0 +1,207 @@
+# benchmarks/check_spotify_session.py
+#
+# Checks spotify_session against a local stub of the Web API: 429 responses
+# with and without Retry-After (including one thread's 429 holding back the
+# others), the token bucket, and TokenRefresher renewing a token before the
+# stub starts rejecting it. Needs no credentials or network.
+# Run from the repo root:  python -m benchmarks.check_spotify_session
+
+import http.server
+import json
+import sys
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import spotipy
+
+from spotify_session import (
+    DEFAULT_RETRY_AFTER, MAX_RATE_LIMIT_RETRIES, RateLimitedSession, TokenBucket, TokenRefresher,
+)
+
+# Timing checks allow this much slack (seconds)
+SLACK = 0.05
+
+
+class StubSpotify(http.server.BaseHTTPRequestHandler):
+    """
+    /v1/limited/<name>?after=<s>&times=<n>  429 for the first n requests to that
+                                            path (Retry-After: s, omitted if s < 0),
+                                            then 200
+    /v1/me                                  200 for a current token, 401 otherwise
+    anything else                           200
+    Every request's path and arrival time is recorded in `hits`.
+    """
+
+    hits = []
+    tokens = {}  # access token -> expires_at
+    _counts = {}
+    _lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        with self._lock:
+            self.hits.append((url.path, time.monotonic()))
+            seen = self._counts[url.path] = self._counts.get(url.path, 0) + 1
+
+        headers = {}
+        if url.path.startswith("/v1/limited/") and seen <= int(query.get("times", ["1"])[0]):
+            status, body = 429, {"error": {"status": 429, "message": "API rate limit exceeded"}}
+            after = float(query.get("after", ["0"])[0])
+            if after >= 0:
+                headers["Retry-After"] = f"{after:g}"
+        elif url.path.rstrip("/") == "/v1/me":
+            token = self.headers.get("Authorization", "").removeprefix("Bearer ")
+            if self.tokens.get(token, 0) > time.time():
+                status, body = 200, {"id": "stub-user"}
+            else:
+                status, body = 401, {"error": {"status": 401, "message": "The access token expired"}}
+        else:
+            status, body = 200, {"ok": True}
+
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class FakeAuthManager:
+    """Just enough of SpotifyOAuth for spotipy and TokenRefresher; tokens are registered with the stub."""
+
+    def __init__(self, expires_in):
+        self.issued = 0
+        self._issue(expires_in)
+
+    def _issue(self, expires_in):
+        token = f"token-{id(self)}-{self.issued}"
+        self.issued += 1
+        self.token_info = {"access_token": token, "refresh_token": "refresh",
+                           "expires_at": time.time() + expires_in}
+        StubSpotify.tokens[token] = self.token_info["expires_at"]
+
+    def get_cached_token(self):
+        return dict(self.token_info)
+
+    def get_access_token(self, as_dict=True):
+        return dict(self.token_info) if as_dict else self.token_info["access_token"]
+
+    def refresh_access_token(self, refresh_token):
+        self._issue(3600)
+        return dict(self.token_info)
+
+
+def _check(results, name, ok, detail):
+    results.append(ok)
+    print(f"{'✅' if ok else '❌'} {name}: {detail}")
+
+
+def _timed_get(session, url):
+    start = time.monotonic()
+    response = session.get(url)
+    return response, time.monotonic() - start
+
+
+def check_retry_after(base, results):
+    session = RateLimitedSession(bucket=TokenBucket(rate=0))
+    response, elapsed = _timed_get(session, f"{base}/v1/limited/retry-after?after=0.5")
+    _check(results, "429 + Retry-After: 0.5", response.status_code == 200 and elapsed >= 0.5 - SLACK
+           and session.rate_limited == 1,
+           f"status {response.status_code} after {elapsed:.2f}s, {session.rate_limited} rate limited")
+
+
+def check_missing_retry_after(base, results):
+    session = RateLimitedSession(bucket=TokenBucket(rate=0))
+    response, elapsed = _timed_get(session, f"{base}/v1/limited/no-header?after=-1")
+    _check(results, "429 without Retry-After", response.status_code == 200
+           and elapsed >= DEFAULT_RETRY_AFTER - SLACK,
+           f"status {response.status_code} after {elapsed:.2f}s (default {DEFAULT_RETRY_AFTER:g}s)")
+
+
+def check_gives_up(base, results):
+    session = RateLimitedSession(bucket=TokenBucket(rate=0))
+    response = session.get(f"{base}/v1/limited/always?after=0&times=100")
+    sent = sum(1 for path, _ in StubSpotify.hits if path == "/v1/limited/always")
+    _check(results, "429 that never clears", response.status_code == 429
+           and sent == MAX_RATE_LIMIT_RETRIES + 1,
+           f"status {response.status_code} after {sent} attempts")
+
+
+def check_shared_backoff(base, results):
+    """A request from another thread during the Retry-After window waits it out too."""
+    session = RateLimitedSession(bucket=TokenBucket(rate=0))
+    limited = threading.Thread(target=session.get, args=(f"{base}/v1/limited/shared?after=0.5",))
+    limited.start()
+    while not any(path == "/v1/limited/shared" for path, _ in StubSpotify.hits):
+        time.sleep(0.01)
+    time.sleep(0.1)  # Let the 429 be processed
+    session.get(f"{base}/v1/other")
+    limited.join()
+
+    first_429 = min(at for path, at in StubSpotify.hits if path == "/v1/limited/shared")
+    other_at = max(at for path, at in StubSpotify.hits if path == "/v1/other")
+    _check(results, "Retry-After shared across threads", other_at - first_429 >= 0.5 - SLACK,
+           f"other thread's request sent {other_at - first_429:.2f}s after the 429")
+
+
+def check_token_bucket(base, results):
+    rate, capacity, requests = 20, 5, 15
+    session = RateLimitedSession(bucket=TokenBucket(rate=rate, capacity=capacity))
+    start = time.monotonic()
+    for _ in range(requests):
+        session.get(f"{base}/v1/bucket")
+    elapsed = time.monotonic() - start
+    expected = (requests - capacity) / rate
+    _check(results, f"token bucket ({rate}/s, burst {capacity})", elapsed >= expected - SLACK
+           and session.throttled == requests - capacity,
+           f"{requests} requests in {elapsed:.2f}s (≥ {expected:.2f}s), {session.throttled} throttled")
+
+
+def _me(base, auth_manager):
+    sp = spotipy.Spotify(auth_manager=auth_manager, requests_session=RateLimitedSession())
+    sp.prefix = f"{base}/v1/"
+    try:
+        return sp.me().get("id")
+    except spotipy.SpotifyException as e:
+        return e.http_status
+
+
+def check_token_refresh(base, results):
+    """Both tokens expire 1.5s from now; only the one with a refresher (1s margin) is renewed in time."""
+    refreshed, unrefreshed = FakeAuthManager(expires_in=1.5), FakeAuthManager(expires_in=1.5)
+    refresher = TokenRefresher(refreshed, margin=1).start()
+    time.sleep(2)
+    refresher.stop()
+    with_refresher, without = _me(base, refreshed), _me(base, unrefreshed)
+    _check(results, "token refreshed before expiry", with_refresher == "stub-user" and without == 401
+           and refresher.refreshes == 1,
+           f"/me → {with_refresher!r} with the refresher ({refresher.refreshes} refresh), "
+           f"{without!r} without")
+
+
+def run():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StubSpotify)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    results = []
+    try:
+        for check in (check_retry_after, check_missing_retry_after, check_gives_up,
+                      check_shared_backoff, check_token_bucket, check_token_refresh):
+            check(base, results)
+    finally:
+        server.shutdown()
+
+    print(f"📊 {sum(results)}/{len(results)} checks passed")
+    return all(results)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run() else 1)
@@ -0,0 +1,77 @@
+# benchmarks/fake_spotify.py
+#
+# In-memory stand-in for spotipy.Spotify that serves synthetic payloads,
+# so the recommender can be benchmarked offline and without rate limits.
+
+import collections
+import zlib
+
+
+class _FakeAuthManager:
+    def get_cached_token(self):
+        return {"access_token": "fake", "refresh_token": "fake", "expires_at": 2 ** 31}
+
+    def is_token_expired(self, token_info):
+        return False
+
+    def refresh_access_token(self, refresh_token):
+        return self.get_cached_token()
+
+
+class FakeSpotify:
+    """
+    Implements the spotipy.Spotify methods the recommender calls. Search
+    results are a deterministic slice of the catalog chosen by the query text,
+    and every call is counted in `calls`.
+    """
+
+    def __init__(self, tracks, artists, current_track_id=None):
+        self.tracks_by_id = {t['id']: t for t in tracks}
+        self.track_list = tracks
+        self.artists_by_id = {a['id']: a for a in artists}
+        self.artist_list = artists
+        self.current_track_id = current_track_id or (tracks[0]['id'] if tracks else None)
+        self.auth_manager = _FakeAuthManager()
+        self.calls = collections.Counter()
+
+    def track(self, track_id):
+        self.calls['track'] += 1
+        return self.tracks_by_id[track_id]
+
+    def tracks(self, track_ids):
+        self.calls['tracks'] += 1
+        return {'tracks': [self.tracks_by_id.get(i) for i in track_ids]}
+
+    def artist(self, artist_id):
+        self.calls['artist'] += 1
+        return self.artists_by_id[artist_id]
+
+    def artists(self, artist_ids):
+        self.calls['artists'] += 1
+        return {'artists': [self.artists_by_id.get(i) for i in artist_ids]}
+
+    def artist_related_artists(self, artist_id):
+        self.calls['artist_related_artists'] += 1
+        start = zlib.crc32(artist_id.encode()) % len(self.artist_list)
+        return {'artists': [self.artist_list[(start + i) % len(self.artist_list)] for i in range(1, 21)]}
+
+    def artist_top_tracks(self, artist_id, country="US"):
+        self.calls['artist_top_tracks'] += 1
+        return {'tracks': [t for t in self.track_list if t['artists'][0]['id'] == artist_id][:10]}
+
+    def search(self, q, limit=10, offset=0, type='track', market=None):
+        self.calls['search'] += 1
+        if not self.track_list:
+            return {'tracks': {'items': []}}
+        start = (zlib.crc32(q.encode()) + offset) % len(self.track_list)
+        items = [self.track_list[(start + i) % len(self.track_list)]
+                 for i in range(min(limit, len(self.track_list)))]
+        return {'tracks': {'items': items}}
+
+    def current_playback(self):
+        self.calls['current_playback'] += 1
+        track = self.tracks_by_id.get(self.current_track_id)
+        if track is None:
+            return None
+        return {'is_playing': True, 'progress_ms': 0, 'shuffle_state': False,
+                'repeat_state': 'off', 'item': track}
@@ -0,0 +1,59 @@
+# benchmarks/synthetic.py
+
+import random
+
+from algorithms.feature_estimator import GENRE_KEYS
+
+# Extra qualifiers so genre strings look like Spotify's ("dance pop", "indie rock", ...)
+GENRE_QUALIFIERS = ["", "dance", "indie", "modern", "alt", "uk", "k-", "latin", "deep", "album"]
+
+
+def generate_artists(n, seed=0):
+    """Spotify-shaped full artist objects."""
+    rnd = random.Random(seed)
+    artists = []
+    for i in range(n):
+        genres = [
+            f"{rnd.choice(GENRE_QUALIFIERS)} {rnd.choice(GENRE_KEYS)}".strip()
+            for _ in range(rnd.randint(0, 4))
+        ]
+        artists.append({
+            'id': f"artist{i:06d}",
+            'name': f"Artist {i}",
+            'uri': f"spotify:artist:artist{i:06d}",
+            'genres': genres,
+            'popularity': rnd.randint(0, 100),
+            'followers': {'total': int(rnd.paretovariate(1.2) * 10000)},
+        })
+    return artists
+
+
+def generate_tracks(n, artists, seed=0):
+    """Spotify-shaped full track objects whose primary artist is drawn from `artists`."""
+    rnd = random.Random(seed + 1)
+    tracks = []
+    for i in range(n):
+        artist = rnd.choice(artists)
+        year = rnd.randint(1965, 2025)
+        track_id = f"track{i:07d}"
+        tracks.append({
+            'id': track_id,
+            'name': f"Song {i}",
+            'uri': f"spotify:track:{track_id}",
+            'popularity': rnd.randint(0, 100),
+            'explicit': rnd.random() < 0.25,
+            'duration_ms': rnd.randint(90000, 420000),
+            'album': {
+                'id': f"album{i // 10:06d}",
+                'uri': f"spotify:album:album{i // 10:06d}",
+                'release_date': f"{year}-{rnd.randint(1, 12):02d}-01" if rnd.random() > 0.02 else '',
+            },
+            'artists': [{'id': artist['id'], 'name': artist['name'], 'uri': artist['uri']}],
+        })
+    return tracks
+
+
+def generate_catalog(n_tracks, seed=0):
+    """(tracks, artists) for a catalog of n_tracks, with about 20 tracks per artist."""
+    artists = generate_artists(max(10, n_tracks // 20), seed=seed)
+    return generate_tracks(n_tracks, artists, seed=seed), artists
@@ -0,0 +1,154 @@
+"""
+Command Executor
+================
+Runs user commands one at a time, in the order they arrive, on a single
+worker thread with a bounded backlog. Back-to-back repeats of idempotent
+commands are coalesced and every command's latency is recorded; the `stats`
+command shows them via report_command_latencies().
+"""
+
+import collections
+import os
+import sys
+import threading
+import time
+
+# Commands waiting behind the running one; anything beyond this is rejected
+MAX_BACKLOG = int(os.getenv("ASHDJ_COMMAND_BACKLOG", "16"))
+
+# A repeat of the command that just started, within this window (seconds), is dropped
+DEBOUNCE_SECONDS = 1.0
+
+# Commands whose result doesn't change by running them twice in a row
+IDEMPOTENT_COMMANDS = {"status", "help", "pause", "play"}
+
+# Latency samples kept per command
+LATENCY_SAMPLES = 256
+
+
+_active_executor = None
+
+
+def command_name(command):
+    """Metrics/debounce key for a command: its first word ("play", "queue", ...)."""
+    words = command.split()
+    return words[0] if words else ""
+
+
+class CommandExecutor:
+    """
+    Ordered, bounded front door for `handler(command)`.
+
+    submit() never blocks the caller: the command is queued for the worker,
+    merged into an identical idempotent command directly before it (the last
+    one pending, or with nothing pending the one started within
+    DEBOUNCE_SECONDS), or rejected if the backlog is full. Only the directly
+    preceding command counts, so "pause, play, pause" keeps all three.
+    """
+
+    def __init__(self, handler, max_backlog=MAX_BACKLOG, debounce_seconds=DEBOUNCE_SECONDS):
+        self.handler = handler
+        self.max_backlog = max_backlog
+        self.debounce_seconds = debounce_seconds
+        self.coalesced = 0
+        self.rejected = 0
+        self._pending = collections.deque()
+        self._condition = threading.Condition()
+        self._last_started = (None, 0.0)  # (normalized command, when it started)
+        self._latencies = collections.defaultdict(lambda: collections.deque(maxlen=LATENCY_SAMPLES))
+        self._thread = threading.Thread(target=self._run, daemon=True, name="commands")
+        self._thread.start()
+
+        global _active_executor
+        _active_executor = self
+
+    def submit(self, command, source="text"):
+        """Queue a command; returns False if it was coalesced away or rejected."""
+        command = command.strip()
+        if not command:
+            return False
+        key = command.lower()
+        now = time.time()
+
+        with self._condition:
+            if key in IDEMPOTENT_COMMANDS:
+                if self._pending:
+                    repeat = self._pending[-1]["key"] == key
+                else:
+                    last_key, last_started = self._last_started
+                    repeat = last_key == key and now - last_started < self.debounce_seconds
+                if repeat:
+                    self.coalesced += 1
+                    return False
+
+            if len(self._pending) >= self.max_backlog:
+                self.rejected += 1
+                print(f"⚠️  Too many commands waiting, ignoring: {command}")
+                return False
+
+            self._pending.append({"command": command, "key": key, "source": source, "queued_at": now})
+            self._condition.notify()
+            return True
+
+    def pending(self):
+        with self._condition:
+            return len(self._pending)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                item = self._pending.popleft()
+                started = time.time()
+                self._last_started = (item["key"], started)
+
+            try:
+                self.handler(item["command"])
+            except SystemExit as e:
+                # "exit" shouldn't take the worker down with it
+                print(e)
+            except Exception as e:
+                print(f"❌ Command failed ({item['command']}): {e}", file=sys.__stderr__)
+            finally:
+                finished = time.time()
+                with self._condition:
+                    self._latencies[command_name(item["key"])].append(
+                        (started - item["queued_at"], finished - started))
+
+    def stats(self):
+        """Per-command latency summary in milliseconds: count, mean/p95/max run time, mean wait."""
+        with self._condition:
+            samples = {name: list(values) for name, values in self._latencies.items()}
+
+        summary = {}
+        for name, values in samples.items():
+            waits = [wait for wait, _ in values]
+            runs = sorted(run for _, run in values)
+            summary[name] = {
+                "count": len(runs),
+                "mean_ms": 1000 * sum(runs) / len(runs),
+                "p95_ms": 1000 * runs[min(len(runs) - 1, int(0.95 * len(runs)))],
+                "max_ms": 1000 * runs[-1],
+                "mean_wait_ms": 1000 * sum(waits) / len(waits),
+            }
+        return summary
+
+    def report(self, output_func=print):
+        summary = self.stats()
+        if not summary:
+            output_func("⏱️  No commands timed yet.")
+            return
+
+        output_func(f"⏱️  Command latency (last {LATENCY_SAMPLES} runs each; "
+                    f"{self.coalesced} coalesced, {self.rejected} rejected):")
+        for name, s in sorted(summary.items(), key=lambda item: -item[1]["count"]):
+            output_func(f"  {name or '(empty)':<10} {s['count']:>5} runs  avg {s['mean_ms']:7.1f} ms  "
+                        f"p95 {s['p95_ms']:7.1f} ms  max {s['max_ms']:7.1f} ms  "
+                        f"waited {s['mean_wait_ms']:6.1f} ms")
+
+
+def report_command_latencies(output_func=print):
+    """Latency report of the running CommandExecutor; nothing when commands run without one (CLI)."""
+    if _active_executor is not None:
+        _active_executor.report(output_func)
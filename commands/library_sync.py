@@ -0,0 +1,272 @@
+"""
+Library Sync
+============
+Copies the user's saved tracks, top tracks and playlists into the local
+track library (SQLite), so song lookups and recommendations can use them
+without the Web API. Pages are fetched in parallel. Later syncs only fetch
+what changed: saved tracks newer than the last sync's newest `added_at`, and
+playlists whose `snapshot_id` moved. The `sync` command runs in the
+background so playback commands aren't held up behind it.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from algorithms.feature_estimator import estimate_features_batch
+from algorithms.feature_store import get_default_store
+from algorithms.metadata_cache import get_artists
+from algorithms.track_library import SAVED_SOURCE, get_default_library
+from commands.query_resolver import normalize_query
+
+# Library pages in flight at once
+SYNC_CONCURRENCY = int(os.getenv("ASHDJ_SYNC_CONCURRENCY", "4"))
+
+# Page sizes are the maximum each endpoint allows
+SAVED_PAGE_SIZE = 50
+PLAYLIST_PAGE_SIZE = 50
+PLAYLIST_ITEMS_PAGE_SIZE = 100
+TOP_PAGE_SIZE = 50
+
+TOP_TIME_RANGES = ("short_term", "medium_term", "long_term")
+
+_sync_lock = threading.Lock()
+
+
+def _track_items(items):
+    """(track, added_at) for the playable Spotify tracks in a page of saved/playlist items."""
+    for item in items or []:
+        track = (item or {}).get('track')
+        if not track or not track.get('id') or track.get('is_local'):
+            continue
+        if track.get('type', 'track') != 'track':
+            continue
+        yield track, item.get('added_at')
+
+
+def _skipped(items):
+    """How many items in a page _track_items drops (local, unavailable or non-track items)."""
+    items = items or []
+    return len(items) - sum(1 for _ in _track_items(items))
+
+
+def _offsets(total, page_size):
+    """Offsets of every page after the first."""
+    return range(page_size, total, page_size)
+
+
+class LibrarySync:
+    """One sync run: fetches what changed and writes it to the library and feature store."""
+
+    def __init__(self, sp, library, store=None, max_workers=None, output_func=print):
+        self.sp = sp
+        self.library = library
+        self.store = store
+        self.output_func = output_func
+        self.max_workers = max(1, max_workers or SYNC_CONCURRENCY)
+        self.fetched = {}  # track_id -> track, everything seen this run
+        self.summary = {"saved_new": 0, "saved_full": False, "playlists_updated": 0,
+                        "playlists_unchanged": 0, "playlists_removed": 0, "errors": 0}
+
+    def _parallel(self, calls):
+        """Run (fn, kwargs) pairs on the pool, each in a copy of this context; results in order."""
+        futures = [self._executor.submit(contextvars.copy_context().run, fn, **kwargs)
+                   for fn, kwargs in calls]
+        return [future.result() for future in futures]
+
+    def _remember(self, pairs):
+        pairs = list(pairs)
+        for track, _ in pairs:
+            self.fetched[track['id']] = track
+        return [(track['id'], added_at) for track, added_at in pairs]
+
+    def run(self):
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="sync") as executor:
+            self._executor = executor
+            for name, step in (("saved tracks", self._sync_saved),
+                               ("top tracks", self._sync_top),
+                               ("playlists", self._sync_playlists)):
+                try:
+                    step()
+                except Exception as e:
+                    self.summary["errors"] += 1
+                    self.output_func(f"⚠️  Could not sync {name}: {e}")
+
+        if self.fetched:
+            tracks = list(self.fetched.values())
+            self.library.add_tracks(
+                tracks,
+                [normalize_query(t.get('name', '')) for t in tracks],
+                [normalize_query(t['artists'][0]['name']) if t.get('artists') else '' for t in tracks],
+            )
+        # Features first: prune() marks the sync done for anything cached against the library
+        self.summary["features"] = self._estimate_features()
+        self.summary["pruned"] = self.library.prune()
+        return self.summary
+
+    def _sync_saved(self):
+        """
+        Newest-first paging; stops at the first item saved before the last sync.
+        Spotify's `total` also counts items we don't store (local or
+        unavailable tracks), so how many were skipped is kept in sync_state.
+        """
+        since = self.library.get_state("saved_added_at")
+        skipped = int(self.library.get_state("saved_skipped", "0"))
+        first = self.sp.current_user_saved_tracks(limit=SAVED_PAGE_SIZE, offset=0)
+        total = first.get('total', 0)
+
+        if since:
+            new, new_skipped, page, offset = [], 0, first, 0
+            while True:
+                items = [item for item in page.get('items') or [] if item]
+                fresh = [item for item in items if item.get('added_at') and item['added_at'] > since]
+                new.extend(_track_items(fresh))
+                new_skipped += _skipped(fresh)
+                offset += SAVED_PAGE_SIZE
+                if len(fresh) < len(items) or not page.get('next') or offset >= total:
+                    break
+                page = self.sp.current_user_saved_tracks(limit=SAVED_PAGE_SIZE, offset=offset)
+
+            # Removed (un-liked) tracks only show up as a count mismatch; then re-read everything
+            if self.library.source_count(SAVED_SOURCE) + skipped + len(new) + new_skipped == total:
+                self.library.add_to_source(SAVED_SOURCE, self._remember(new))
+                self.library.set_state("saved_skipped", str(skipped + new_skipped))
+                self.summary["saved_new"] = len(new)
+                self._advance_saved(new, since)
+                self.output_func(f"📥 Saved tracks: {len(new)} new")
+                return
+
+        pages = [first] + self._parallel([
+            (self.sp.current_user_saved_tracks, {"limit": SAVED_PAGE_SIZE, "offset": offset})
+            for offset in _offsets(total, SAVED_PAGE_SIZE)
+        ])
+        everything = [pair for page in pages for pair in _track_items(page.get('items'))]
+        self.library.replace_source(SAVED_SOURCE, self._remember(everything))
+        self.library.set_state("saved_skipped", str(sum(_skipped(page.get('items')) for page in pages)))
+        self.summary["saved_new"] = len(everything)
+        self.summary["saved_full"] = True
+        self._advance_saved(everything, since)
+        self.output_func(f"📥 Saved tracks: {len(everything)} read")
+
+    def _advance_saved(self, pairs, since):
+        newest = max((added for _, added in pairs if added), default=since)
+        if newest:
+            self.library.set_state("saved_added_at", newest)
+
+    def _sync_top(self):
+        pages = self._parallel([
+            (self.sp.current_user_top_tracks, {"limit": TOP_PAGE_SIZE, "time_range": time_range})
+            for time_range in TOP_TIME_RANGES
+        ])
+        for time_range, page in zip(TOP_TIME_RANGES, pages):
+            tracks = [(t, None) for t in page.get('items', []) if t and t.get('id')]
+            self.library.replace_source(f"top:{time_range}", self._remember(tracks))
+        self.output_func("📥 Top tracks updated")
+
+    def _sync_playlists(self):
+        first = self.sp.current_user_playlists(limit=PLAYLIST_PAGE_SIZE, offset=0)
+        pages = [first] + self._parallel([
+            (self.sp.current_user_playlists, {"limit": PLAYLIST_PAGE_SIZE, "offset": offset})
+            for offset in _offsets(first.get('total', 0), PLAYLIST_PAGE_SIZE)
+        ])
+        playlists = [p for page in pages for p in page.get('items', []) if p and p.get('id')]
+
+        known = self.library.playlist_snapshots()
+        removed = set(known) - {p['id'] for p in playlists}
+        if removed:
+            self.library.remove_playlists(removed)
+        changed = [p for p in playlists if known.get(p['id']) != p.get('snapshot_id')]
+        self.summary["playlists_removed"] = len(removed)
+        self.summary["playlists_unchanged"] = len(playlists) - len(changed)
+        if not changed:
+            self.output_func(f"📥 Playlists: all {len(playlists)} unchanged")
+            return
+        self.output_func(f"📥 Playlists: fetching {len(changed)} changed of {len(playlists)}...")
+
+        # First page of every changed playlist in parallel, then all their remaining pages
+        firsts = self._parallel([
+            (self.sp.playlist_items, {"playlist_id": p['id'], "limit": PLAYLIST_ITEMS_PAGE_SIZE,
+                                      "offset": 0, "additional_types": ("track",)})
+            for p in changed
+        ])
+        rest_calls, owners = [], []
+        for index, (playlist, page) in enumerate(zip(changed, firsts)):
+            for offset in _offsets(page.get('total', 0), PLAYLIST_ITEMS_PAGE_SIZE):
+                rest_calls.append((self.sp.playlist_items, {
+                    "playlist_id": playlist['id'], "limit": PLAYLIST_ITEMS_PAGE_SIZE,
+                    "offset": offset, "additional_types": ("track",)}))
+                owners.append(index)
+        items = [list(_track_items(page.get('items'))) for page in firsts]
+        for index, page in zip(owners, self._parallel(rest_calls)):
+            items[index].extend(_track_items(page.get('items')))
+
+        for playlist, pairs in zip(changed, items):
+            self.library.set_playlist(playlist['id'], playlist.get('name'), playlist.get('snapshot_id'),
+                                      self._remember(pairs))
+        self.summary["playlists_updated"] = len(changed)
+
+    def _estimate_features(self):
+        """Estimate and store features for fetched tracks the feature store doesn't have yet."""
+        if self.store is None or not self.fetched:
+            return 0
+        track_ids = list(self.fetched)
+        missing = [track_id for track_id, row in zip(track_ids, self.store.lookup(track_ids)) if row < 0]
+        if not missing:
+            return 0
+        tracks = [self.fetched[track_id] for track_id in missing]
+        artist_ids = [t['artists'][0]['id'] for t in tracks if t.get('artists') and t['artists'][0].get('id')]
+        try:
+            artists_by_id = get_artists(self.sp, artist_ids)
+        except Exception as e:
+            self.output_func(f"⚠️  Could not fetch artists for feature estimation: {e}")
+            artists_by_id = {}
+        artists = [artists_by_id.get(t['artists'][0].get('id')) if t.get('artists') else None
+                   for t in tracks]
+        self.store.put_many(missing, np.asarray(estimate_features_batch(tracks, artists), dtype=np.float32))
+        return len(missing)
+
+
+def sync_library(sp, output_func=print):
+    """The `sync` command: bring the local library up to date and report what changed."""
+    library = get_default_library()
+    if library is None:
+        output_func("❌ Local library is unavailable")
+        return None
+    if not _sync_lock.acquire(blocking=False):
+        output_func("⏳ A library sync is already running")
+        return None
+    try:
+        output_func("🔄 Syncing your Spotify library...")
+        start = time.perf_counter()
+        summary = LibrarySync(sp, library, store=get_default_store(), output_func=output_func).run()
+        stats = library.stats()
+        saved = (f"re-read in full ({summary['saved_new']})" if summary["saved_full"]
+                 else f"{summary['saved_new']} new")
+        output_func(f"✅ Library synced in {time.perf_counter() - start:.1f}s: saved tracks {saved}, "
+                    f"{summary['playlists_updated']} playlists updated "
+                    f"({summary['playlists_unchanged']} unchanged, {summary['playlists_removed']} removed), "
+                    f"{summary['features']} tracks' features estimated")
+        output_func(f"📚 {stats['tracks']} tracks locally ({stats['saved']} saved, "
+                    f"{stats['playlists']} playlists)")
+        return summary
+    finally:
+        _sync_lock.release()
+
+
+def start_library_sync(sp, output_func=print):
+    """
+    Run sync_library on its own daemon thread (in a copy of the caller's
+    context, so its API calls stay attributed to the command) and return it.
+    """
+    if _sync_lock.locked():
+        output_func("⏳ A library sync is already running")
+        return None
+    context = contextvars.copy_context()
+    thread = threading.Thread(target=context.run, args=(sync_library, sp, output_func),
+                              daemon=True, name="library-sync")
+    thread.start()
+    return thread
@@ -7,6 +7,10 @@ from commands.spotify_controls import (
 
 from algorithms.knn_recommender import find_similar_tracks
 from algorithms.intent_parser import parse_intent
+from api_tracing import api_tracer, command_scope
+from command_executor import report_command_latencies
+from commands.library_sync import start_library_sync
+from commands.prefetch import get_prefetcher
 
 
 def print_help(output_func=print):
@@ -22,11 +26,19 @@ shuffle               🔀  Toggles shuffle on/off
 repeat                🔁  Toggles repeat mode (off → context → track)
 queue [song name]     ➕  Adds song to playback queue
 status                🎵  Shows current playing song
+stats                 📊  Shows Spotify API calls and latency per command
+sync                  📚  Syncs your saved tracks, top tracks and playlists locally
 help                  📜  Shows this message
 exit                  ❌  Exits the app
 """)
 
 
+def show_stats(output_func=print):
+    """API calls per command, then how long commands took through the command executor."""
+    api_tracer.report(output_func)
+    report_command_latencies(output_func)
+
+
 def process_command(sp, command, output_func=print):
     """Process user commands and execute corresponding functions."""
     command = command.strip().lower()
@@ -38,22 +50,32 @@ def process_command(sp, command, output_func=print):
         "shuffle": toggle_shuffle,
         "repeat": toggle_repeat,
         "status": current_status,
+        "stats": lambda sp: show_stats(output_func),
+        "sync": lambda sp: start_library_sync(sp, output_func),
         "help": lambda sp: print_help(output_func),
         "exit": lambda sp: sys.exit("👋 Exiting. Goodbye!")
     }
 
     if command in base_commands:
-        base_commands[command](sp)
+        with command_scope(command):
+            base_commands[command](sp)
         return
 
     if command.startswith("queue "):
         song = command[6:]
-        add_to_queue(sp, song)
+        with command_scope("queue"):
+            add_to_queue(sp, song)
         return
 
     intent_data = parse_intent(command)
     print(f"🔍 Detected intent: {intent_data}")
 
+    # Spotify calls below are attributed to the intent ("play_similar", "play_exact", ...)
+    with command_scope("play" if command == "play" else intent_data["intent"]):
+        _dispatch_intent(sp, command, intent_data, output_func)
+
+
+def _dispatch_intent(sp, command, intent_data, output_func):
     if intent_data["intent"] == "play_similar":
         play_similar_song(sp, intent_data["track_query"])
     elif intent_data["intent"] == "play_mood":
@@ -78,6 +100,8 @@ def run_interactive_menu(sp, single_command=None, output_func=print):
     if single_command:
         process_command(sp, single_command, output_func)
         return
+
+    get_prefetcher(sp)
     
     while True:
         try:
@@ -0,0 +1,173 @@
+"""
+Playback State Cache
+====================
+One shared snapshot of sp.current_playback(), kept fresh by a low-frequency
+background poller and patched optimistically after our own commands.
+"""
+
+import copy
+import os
+import threading
+import time
+
+from api_tracing import command_scope
+
+# How often the background poller refreshes the snapshot (seconds). Kept slow:
+# our own commands invalidate() or update() it, a track that should have ended
+# forces a refetch in get(), and `status` always fetches live.
+POLL_INTERVAL = float(os.getenv("ASHDJ_PLAYBACK_POLL_SECONDS", "30"))
+
+# Default staleness bound: older snapshots are refetched before use
+MAX_AGE = float(os.getenv("ASHDJ_PLAYBACK_MAX_AGE", "15"))
+
+# After a skip or a new start_playback we can't know the new track; refresh this soon
+REFRESH_AFTER_CHANGE = 1.0
+
+
+class PlaybackState:
+    """
+    Cached playback snapshot for one Spotify client.
+
+    get() returns the snapshot if it is younger than the staleness bound and
+    the playing track can't have ended since, otherwise it refetches (one API
+    call). update() applies the effect of our own mutations (shuffle, repeat,
+    pause/resume) without a round trip; invalidate() is for changes we can't
+    predict, like skipping, and schedules a quick background refresh.
+
+    Listeners added with add_track_listener() are called with the new
+    snapshot whenever a fetch shows a different track than the last one.
+    """
+
+    def __init__(self, sp, poll_interval=POLL_INTERVAL, max_age=MAX_AGE):
+        self.sp = sp
+        self.poll_interval = poll_interval
+        self.max_age = max_age
+        self.fetches = 0
+        self._snapshot = None
+        self._fetched_at = None
+        self._valid = False
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._refresh_at = None
+        self._poller = None
+        self._listeners = []
+        self._track_id = None
+
+    # ---- reads ----
+
+    def get(self, max_age=None):
+        """Current playback dict (or None when nothing is active), refetched only if stale."""
+        with self._lock:
+            if self._is_fresh(self.max_age if max_age is None else max_age):
+                return copy.deepcopy(self._snapshot)
+        return self.refresh()
+
+    def _is_fresh(self, max_age):
+        if not self._valid or self._fetched_at is None:
+            return False
+        age = time.time() - self._fetched_at
+        if age > max_age:
+            return False
+
+        # A playing track that should have finished by now means we're on another song
+        snapshot = self._snapshot
+        if snapshot and snapshot.get('is_playing') and snapshot.get('item'):
+            progress = snapshot.get('progress_ms') or 0
+            duration = snapshot['item'].get('duration_ms') or 0
+            if duration and progress + age * 1000 >= duration:
+                return False
+        return True
+
+    def refresh(self):
+        """Fetch from Spotify now and return the new snapshot."""
+        playback = self.sp.current_playback()
+        track_id = (playback.get('item') or {}).get('id') if playback else None
+        with self._lock:
+            self.fetches += 1
+            self._snapshot = playback
+            self._fetched_at = time.time()
+            self._valid = True
+            track_changed = track_id != self._track_id
+            self._track_id = track_id
+            listeners = list(self._listeners) if track_changed else []
+
+        for listener in listeners:
+            try:
+                listener(copy.deepcopy(playback))
+            except Exception as e:
+                print(f"⚠️  Playback listener failed: {e}")
+        return copy.deepcopy(playback)
+
+    def add_track_listener(self, listener):
+        """Call listener(playback) each time the playing track changes, starting with the current one."""
+        with self._lock:
+            self._listeners.append(listener)
+            if self._fetched_at is None:
+                return
+            playback = copy.deepcopy(self._snapshot)
+        listener(playback)
+
+    # ---- writes ----
+
+    def update(self, **fields):
+        """Optimistically apply a change we just made (e.g. shuffle_state=True)."""
+        with self._lock:
+            if self._snapshot is None:
+                return
+            if fields.get('is_playing') and not self._snapshot.get('is_playing'):
+                # Resuming: restart the progress clock from now
+                self._fetched_at = time.time()
+            elif 'is_playing' in fields and self._snapshot.get('is_playing') and not fields['is_playing']:
+                # Pausing: freeze progress where it is
+                elapsed = (time.time() - self._fetched_at) * 1000
+                self._snapshot['progress_ms'] = (self._snapshot.get('progress_ms') or 0) + elapsed
+            self._snapshot.update(fields)
+
+    def invalidate(self, refresh_in=REFRESH_AFTER_CHANGE):
+        """Mark the snapshot stale and have the poller refetch it shortly."""
+        with self._lock:
+            self._valid = False
+            self._refresh_at = time.time() + refresh_in
+        self._wake.set()
+
+    # ---- background poller ----
+
+    def start_poller(self):
+        with self._lock:
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll, daemon=True, name="playback-poller")
+                self._poller.start()
+        return self
+
+    def _poll(self):
+        while True:
+            with self._lock:
+                next_at = self._refresh_at or ((self._fetched_at or 0) + self.poll_interval)
+            delay = next_at - time.time()
+            if delay > 0:
+                self._wake.wait(delay)
+                self._wake.clear()
+                continue
+
+            with self._lock:
+                self._refresh_at = None
+            try:
+                with command_scope("playback poll"):
+                    self.refresh()
+            except Exception as e:
+                print(f"⚠️  Playback poll failed: {e}")
+                with self._lock:
+                    self._fetched_at = time.time()  # Back off for a full interval
+
+
+_states = {}
+_states_lock = threading.Lock()
+
+
+def get_playback_state(sp):
+    """Shared PlaybackState for this Spotify client; starts its poller on first use."""
+    with _states_lock:
+        state = _states.get(id(sp))
+        if state is None or state.sp is not sp:
+            state = _states[id(sp)] = PlaybackState(sp).start_poller()
+        return state
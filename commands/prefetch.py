@@ -0,0 +1,131 @@
+"""
+Recommendation Prefetcher
+=========================
+Computes "songs like this one" for the track that's currently playing in the
+background, so a later "play something like ..." for it answers instantly.
+"""
+
+import collections
+import os
+import threading
+import time
+
+from algorithms.knn_recommender import find_similar_tracks
+from api_tracing import command_scope
+from commands.playback_state import get_playback_state
+
+PREFETCH_ENABLED = os.getenv("ASHDJ_PREFETCH", "1") == "1"
+
+# A track has to stay on this long (seconds) before we spend API calls on it
+PREFETCH_DELAY = 3.0
+
+# Searches in flight for a prefetch; kept low so user commands get the bandwidth
+PREFETCH_SEARCH_CONCURRENCY = 2
+
+# Finished neighbour lists kept, most recent tracks first
+MAX_RESULTS = 16
+RESULT_TTL = 30 * 60
+
+
+class RecommendationPrefetcher:
+    """
+    Listens to PlaybackState track changes and runs find_similar_tracks for
+    the new track on one low-priority worker thread. If the track changes
+    again before or during the computation, that work is dropped. When the
+    current track's result reaches RESULT_TTL it is computed again, and a
+    track that comes back after its result expired is treated as new.
+    """
+
+    def __init__(self, sp, state, delay=PREFETCH_DELAY):
+        self.sp = sp
+        self.delay = delay
+        self.hits = 0
+        self.cancelled = 0
+        self._results = collections.OrderedDict()  # track_id -> (stored_at, similar_tracks)
+        self._target = None
+        self._changed_at = 0
+        self._running = None
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="prefetch")
+        self._thread.start()
+        state.add_track_listener(self._on_track_change)
+
+    def _on_track_change(self, playback):
+        item = (playback or {}).get('item') or {}
+        with self._condition:
+            self._target = item.get('id')
+            self._changed_at = time.time()
+            self._condition.notify_all()
+
+    def _is_current(self, track_id):
+        with self._condition:
+            return self._target == track_id
+
+    def get(self, track_id, wait=True):
+        """
+        Prefetched neighbours for track_id, or None. If that track is being
+        computed right now, wait for it rather than starting a second run.
+        """
+        with self._condition:
+            while wait and self._running == track_id:
+                self._condition.wait()
+            entry = self._results.get(track_id)
+            if not entry or not entry[1] or time.time() - entry[0] > RESULT_TTL:
+                return None  # Failed or expired prefetches are left for the live path
+            self._results.move_to_end(track_id)
+            self.hits += 1
+            return list(entry[1])
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    track_id = self._target
+                    remaining = None
+                    if track_id:
+                        entry = self._results.get(track_id)
+                        if entry and time.time() - entry[0] <= RESULT_TTL:
+                            # Up to date; wake up to refresh it when it expires
+                            remaining = entry[0] + RESULT_TTL - time.time() + 0.01
+                        else:
+                            remaining = self.delay - (time.time() - self._changed_at)
+                            if remaining <= 0:
+                                break
+                    self._condition.wait(remaining)
+                self._running = track_id
+
+            try:
+                with command_scope("prefetch"):
+                    similar = find_similar_tracks(self.sp, track_id,
+                                                  search_concurrency=PREFETCH_SEARCH_CONCURRENCY,
+                                                  should_stop=lambda: not self._is_current(track_id))
+            except Exception as e:
+                print(f"⚠️  Prefetch for {track_id} failed: {e}")
+                similar = []
+
+            with self._condition:
+                self._running = None
+                if similar is None:
+                    self.cancelled += 1  # Skipped before we finished
+                else:
+                    # Store failures too, so an unplayable seed isn't retried in a loop
+                    self._results[track_id] = (time.time(), similar)
+                    self._results.move_to_end(track_id)
+                    while len(self._results) > MAX_RESULTS:
+                        self._results.popitem(last=False)
+                self._condition.notify_all()
+
+
+_prefetchers = {}
+_prefetchers_lock = threading.Lock()
+
+
+def get_prefetcher(sp):
+    """Shared prefetcher for this Spotify client, or None when ASHDJ_PREFETCH=0."""
+    if not PREFETCH_ENABLED:
+        return None
+    with _prefetchers_lock:
+        prefetcher = _prefetchers.get(id(sp))
+        if prefetcher is None or prefetcher.sp is not sp:
+            prefetcher = _prefetchers[id(sp)] = RecommendationPrefetcher(sp, get_playback_state(sp))
+        return prefetcher
@@ -0,0 +1,160 @@
+"""
+Query Resolution
+================
+Turns what the user typed or said into a Spotify track. Queries are
+normalized, artist-name aliases are applied from a table, and the answer is
+cached so asking for the same song again doesn't need a search at all.
+Songs in the synced local library are found without searching.
+"""
+
+import json
+import os
+import re
+import threading
+import unicodedata
+
+from algorithms.metadata_cache import get_default_cache
+from algorithms.track_library import get_default_library
+
+# Optional JSON file of extra {"what people say": "what Spotify calls it"} aliases
+ALIASES_FILE = os.getenv("ASHDJ_QUERY_ALIASES")
+
+# Common misspellings / speech-recognition spellings of artist names
+DEFAULT_ALIASES = {
+    "weekend": "weeknd",
+}
+
+# Anything that isn't a letter, digit, apostrophe or ampersand separates words
+_PUNCTUATION = re.compile(r"[^\w\s'&]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query):
+    """Lowercase, strip punctuation and collapse whitespace: "Blinding Lights!! " → "blinding lights"."""
+    query = unicodedata.normalize("NFKC", query).lower().replace("_", " ")
+    query = _PUNCTUATION.sub(" ", query)
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+def load_aliases(path=ALIASES_FILE):
+    """DEFAULT_ALIASES plus any from the aliases file, with normalized keys."""
+    aliases = dict(DEFAULT_ALIASES)
+    if path:
+        try:
+            with open(path, encoding="utf-8") as f:
+                aliases.update(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Could not load query aliases from {path}: {e}")
+    return {normalize_query(k): normalize_query(v) for k, v in aliases.items() if normalize_query(k)}
+
+
+class QueryResolver:
+    """
+    query → track. The user's own library is checked first ("<name>",
+    "<name> by <artist>" or "<name> <artist>"); otherwise the answer is
+    cached in the metadata cache under the "query" kind (TTL:
+    ASHDJ_QUERY_TTL). On a miss the search strategies run in order and stop
+    at the first one that finds something:
+
+        1. track:<query>      (most restrictive)
+        2. <query>
+        3. <query> with aliases applied, if that changes anything
+
+    With plain=True the unprefixed <query> goes first, matching the single
+    plain search `queue` has always done; those answers are cached
+    separately, since the two orders can pick different tracks.
+    """
+
+    def __init__(self, aliases=None, cache=None, library=None):
+        self.aliases = load_aliases() if aliases is None else aliases
+        self.cache = cache
+        self.library = library
+        self.searches = 0
+        self.library_hits = 0
+        if self.aliases:
+            words = sorted(self.aliases, key=len, reverse=True)
+            self._alias_pattern = re.compile(r"\b(" + "|".join(map(re.escape, words)) + r")\b")
+        else:
+            self._alias_pattern = None
+
+    def apply_aliases(self, query):
+        if self._alias_pattern is None:
+            return query
+        return self._alias_pattern.sub(lambda m: self.aliases[m.group(1)], query)
+
+    def strategies(self, normalized, plain=False):
+        if plain:
+            yield normalized
+            yield f"track:{normalized}"
+        else:
+            yield f"track:{normalized}"
+            yield normalized
+        aliased = self.apply_aliases(normalized)
+        if aliased != normalized:
+            yield aliased
+
+    def library_splits(self, normalized):
+        """(name, artist) readings of a query to look up in the local library."""
+        for text in dict.fromkeys([normalized, self.apply_aliases(normalized)]):
+            yield text, None
+            if " by " in text:
+                name, artist = text.rsplit(" by ", 1)
+                yield name, artist
+            words = text.split()
+            for i in range(len(words) - 1, 0, -1):
+                yield " ".join(words[:i]), " ".join(words[i:])
+
+    def from_library(self, normalized):
+        library = self.library if self.library is not None else get_default_library()
+        if library is None:
+            return None
+        for name, artist in self.library_splits(normalized):
+            track = library.find(name, artist)
+            if track:
+                self.library_hits += 1
+                return track
+        return None
+
+    def resolve(self, sp, query, plain=False):
+        """Best matching track for query, or None."""
+        normalized = normalize_query(query)
+        if not normalized:
+            return None
+
+        track = self.from_library(normalized)
+        if track:
+            return track
+
+        cache = self.cache or get_default_cache()
+        cache_key = f"plain:{normalized}" if plain else normalized
+        track = cache.get("query", cache_key)
+        if track:
+            return track
+
+        for search_query in self.strategies(normalized, plain):
+            self.searches += 1
+            results = sp.search(q=search_query, limit=1, type='track')
+            items = results['tracks']['items']
+            if items:
+                track = items[0]
+                cache.put("query", cache_key, track)
+                cache.put("track", track.get('id'), track)
+                return track
+        return None
+
+
+_default_resolver = None
+_default_resolver_lock = threading.Lock()
+
+
+def get_default_resolver():
+    global _default_resolver
+    with _default_resolver_lock:
+        if _default_resolver is None:
+            _default_resolver = QueryResolver()
+        return _default_resolver
+
+
+def resolve_track(sp, query, plain=False):
+    """Resolve a song query to a track dict using the shared resolver."""
+    return get_default_resolver().resolve(sp, query, plain=plain)
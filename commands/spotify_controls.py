@@ -4,36 +4,39 @@ Spotify Control Functions
 This module contains all the Spotify playback control functions.
 """
 
+import os
+
 from algorithms.knn_recommender import find_similar_tracks
+from algorithms.mood_engine import pick_mood_tracks
+
+from commands.playback_state import get_playback_state
+from commands.prefetch import get_prefetcher
+from commands.query_resolver import resolve_track
+from elevenlabs_api import prewarm
+from speech_queue import say
+
+# Synthesize "now playing" lines for queued tracks ahead of time (costs TTS credits)
+PREWARM_ANNOUNCEMENTS = os.getenv("ASHDJ_TTS_PREWARM", "0") == "1"
+
+# Ways of saying "the song that's playing" in "play something like ..."
+CURRENT_TRACK_QUERIES = {"this", "this song", "this track", "this one", "current song",
+                         "the current song", "what's playing", "what is playing"}
+
+
+def now_playing_line(track_name, artist_name):
+    """The spoken announcement for a track; kept in one place so cached audio gets reused."""
+    return f"Now playing {track_name} by {artist_name}, Ashif senpai!"
 
-from elevenlabs_api import speak
 
 def play_song(sp, query=None):
     """Play a song by search query or resume current playback."""
-    playback = sp.current_playback()
+    state = get_playback_state(sp)
 
     if query:
-        # Try multiple search strategies to find the song
-        tracks = []
-        
-        # Strategy 1: Search with track: prefix (most restrictive)
-        results = sp.search(q=f"track:{query}", limit=5, type='track')
-        tracks = results['tracks']['items']
-        
-        # Strategy 2: Search without prefix if first attempt fails
-        if not tracks:
-            results = sp.search(q=query, limit=5, type='track')
-            tracks = results['tracks']['items']
-        
-        # Strategy 3: Handle common artist name variations
-        if not tracks and 'weekend' in query.lower():
-            modified_query = query.lower().replace('weekend', 'weeknd')
-            results = sp.search(q=modified_query, limit=5, type='track')
-            tracks = results['tracks']['items']
-
-        if tracks:
-            # Pick the top result
-            track = tracks[0]
+        # Cached, or the first hit from the resolver's search strategies
+        track = resolve_track(sp, query)
+
+        if track:
             track_name = track['name']
             artist_name = track['artists'][0]['name']
             track_uri = track['uri']
@@ -44,33 +47,41 @@ def play_song(sp, query=None):
                 # Play from album context but start with the specific track for continuous playback
                 sp.shuffle(True)
                 sp.start_playback(context_uri=album_uri, offset={"uri": track_uri})
+                state.update(shuffle_state=True, is_playing=True)
+                state.invalidate()
                 
                 # Add some popular tracks from the same artist to the queue for immediate variety
                 artist_id = track['artists'][0]['id']
                 top_tracks = sp.artist_top_tracks(artist_id)
                 
                 # Add top 5 tracks from the same artist to queue (excluding the current one)
-                added_count = 0
+                queued = []
                 for top_track in top_tracks['tracks']:
-                    if top_track['uri'] != track_uri and added_count < 5:
+                    if top_track['uri'] != track_uri and len(queued) < 5:
                         sp.add_to_queue(top_track['uri'])
-                        added_count += 1
+                        queued.append(top_track)
+                
+                if PREWARM_ANNOUNCEMENTS:
+                    prewarm([now_playing_line(t['name'], t['artists'][0]['name']) for t in queued])
                 
                 print(f"▶️ Now playing: {track_name} by {artist_name}")
-                speak(f"Now playing {track_name} by {artist_name}, Ashif senpai!")
+                say(now_playing_line(track_name, artist_name), kind="now_playing")
                 
             except Exception:
                 # Fallback: play from album context with shuffle only
                 sp.shuffle(True)
                 sp.start_playback(context_uri=album_uri, offset={"uri": track_uri})
+                state.invalidate()
                 print(f"▶️ Now playing: {track_name} by {artist_name}")
-                speak(f"Now playing {track_name} by {artist_name}, Ashif senpai!")
+                say(now_playing_line(track_name, artist_name), kind="now_playing")
 
         else:
             print("❌ No song found. Try a simpler name or artist.")
     else:
+        playback = state.get()
         if playback and not playback['is_playing']:
             sp.start_playback()
+            state.update(is_playing=True)
             print("▶️ Resumed playback")
         elif playback and playback['is_playing']:
             print("⚠️ Music is already playing.")
@@ -80,9 +91,11 @@ def play_song(sp, query=None):
 
 def pause_song(sp):
     """Pause the current playback."""
-    playback = sp.current_playback()
+    state = get_playback_state(sp)
+    playback = state.get()
     if playback and playback['is_playing']:
         sp.pause_playback()
+        state.update(is_playing=False)
         print("⏸️ Paused playback")
     else:
         print("⚠️ Already paused or nothing is playing.")
@@ -90,9 +103,11 @@ def pause_song(sp):
 
 def next_track(sp):
     """Skip to the next track."""
-    playback = sp.current_playback()
+    state = get_playback_state(sp)
+    playback = state.get()
     if playback:
         sp.next_track()
+        state.invalidate()
         print("⏭️ Skipped to next track")
     else:
         print("❌ No active playback found.")
@@ -100,9 +115,11 @@ def next_track(sp):
 
 def previous_track(sp):
     """Go back to the previous track."""
-    playback = sp.current_playback()
+    state = get_playback_state(sp)
+    playback = state.get()
     if playback:
         sp.previous_track()
+        state.invalidate()
         print("⏮️ Reverted to previous track")
     else:
         print("❌ No active playback found.")
@@ -110,7 +127,8 @@ def previous_track(sp):
 
 def current_status(sp):
     """Display the currently playing song information."""
-    playback = sp.current_playback()
+    # Asked for explicitly, so always fetched live (this also refreshes the shared snapshot)
+    playback = get_playback_state(sp).refresh()
     if playback and playback['item']:
         song = playback['item']['name']
         artist = playback['item']['artists'][0]['name']
@@ -121,10 +139,12 @@ def current_status(sp):
 
 def toggle_shuffle(sp):
     """Toggle shuffle mode on/off."""
-    playback = sp.current_playback()
+    state = get_playback_state(sp)
+    playback = state.get()
     if playback:
         current_shuffle = playback['shuffle_state']
         sp.shuffle(not current_shuffle)
+        state.update(shuffle_state=not current_shuffle)
         print(f"🔀 Shuffle turned {'ON' if not current_shuffle else 'OFF'}")
     else:
         print("❌ No active device found to toggle shuffle.")
@@ -132,7 +152,8 @@ def toggle_shuffle(sp):
 
 def toggle_repeat(sp):
     """Cycle through repeat modes: off → context → track → off."""
-    playback = sp.current_playback()
+    state = get_playback_state(sp)
+    playback = state.get()
     if playback:
         current_repeat = playback['repeat_state']
         new_state = {
@@ -141,6 +162,7 @@ def toggle_repeat(sp):
             'track': 'off'
         }[current_repeat]
         sp.repeat(new_state)
+        state.update(repeat_state=new_state)
         print(f"🔁 Repeat mode set to: {new_state.upper()}")
     else:
         print("❌ No active playback to toggle repeat mode.")
@@ -148,12 +170,11 @@ def toggle_repeat(sp):
 
 def add_to_queue(sp, query):
     """Add a song to the playback queue by search query."""
-    results = sp.search(q=query, limit=1, type='track')
-    tracks = results['tracks']['items']
-    if tracks:
-        track_uri = tracks[0]['uri']
-        sp.add_to_queue(track_uri)
-        print(f"➕ Added to queue: {tracks[0]['name']} by {tracks[0]['artists'][0]['name']}")
+    # Plain search first, as queue always did; `play` prefers a track: match
+    track = resolve_track(sp, query, plain=True)
+    if track:
+        sp.add_to_queue(track['uri'])
+        print(f"➕ Added to queue: {track['name']} by {track['artists'][0]['name']}")
     else:
         print("❌ No matching song found to add to queue.")
 
@@ -164,24 +185,34 @@ def add_to_queue(sp, query):
 def play_similar_song(sp, track_query):
     """
     Search for a track and play 5 similar tracks based on audio features.
+    "this song" (and similar phrases) means the track that's playing now.
     """
     try:
-        print(f"🔎 Searching for track: {track_query}")
-        result = sp.search(q=track_query, type='track')
-
-        if not result['tracks']['items']:
-            print("❌ Track not found.")
-            return
+        if track_query.strip().lower() in CURRENT_TRACK_QUERIES:
+            playback = get_playback_state(sp).get()
+            if not playback or not playback.get('item'):
+                print("❌ Nothing is playing right now.")
+                return
+            track = playback['item']
+        else:
+            print(f"🔎 Searching for track: {track_query}")
+            track = resolve_track(sp, track_query)
 
-        track = result['tracks']['items'][0]
+            if not track:
+                print("❌ Track not found.")
+                return
         track_id = track['id']
         track_name = track['name']
         artist_name = track['artists'][0]['name']
 
         print(f"🎯 Found: {track_name} by {artist_name}")
-        print("🎧 Finding similar tracks...")
-
-        similar_tracks = find_similar_tracks(sp, track_id)
+        prefetcher = get_prefetcher(sp)
+        similar_tracks = prefetcher.get(track_id) if prefetcher else None
+        if similar_tracks:
+            print("⚡ Using recommendations prefetched while the track was playing")
+        else:
+            print("🎧 Finding similar tracks...")
+            similar_tracks = find_similar_tracks(sp, track_id)
 
         if not similar_tracks:
             print("⚠️ No similar tracks found.")
@@ -192,6 +223,7 @@ def play_similar_song(sp, track_query):
 
         # Start playback with the full list, replacing the current queue
         sp.start_playback(uris=new_queue)
+        get_playback_state(sp).invalidate()
 
         print(f"💫 Playing {len(new_queue)} recommended tracks.")
 
@@ -200,7 +232,17 @@ def play_similar_song(sp, track_query):
 
 
 def play_mood_songs(sp, mood):
-    """Play a set of songs based on mood using Spotify genre search."""
+    """
+    Play a set of songs for a mood: sampled from locally known tracks near the
+    mood's feature centroid, or from a Spotify genre search if too few are known.
+    """
+    uris = pick_mood_tracks(mood, count=5)
+    if uris:
+        sp.start_playback(uris=uris)
+        get_playback_state(sp).invalidate()
+        print(f"💫 Playing {mood.capitalize()} mood picks from your known tracks.")
+        return
+
     genre_map = {
         "sad": "sad",
         "happy": "happy",
@@ -215,6 +257,7 @@ def play_mood_songs(sp, mood):
     if tracks:
         uris = [track['uri'] for track in tracks[:5]]
         sp.start_playback(uris=uris)
+        get_playback_state(sp).invalidate()
         print(f"💫 Playing {mood.capitalize()} mood playlist.")
     else:
         print("❌ Couldn't find mood-based songs.")
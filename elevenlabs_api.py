@@ -1,47 +1,420 @@
 import os
 import sys
 import io
-import pygame
-from elevenlabs import ElevenLabs
+import threading
+import queue
+import time
+from collections import deque
+
+from startup import LAZY_STARTUP
+from tts_cache import TTSCache, cache_key
+
+DEFAULT_VOICE = "gARvXPexe5VF3cKZBian"
+DEFAULT_MODEL = "eleven_multilingual_v2"
+
+# Streaming mode asks ElevenLabs for raw 16-bit mono PCM, which can be played
+# chunk by chunk as it downloads; buffered mode downloads a whole MP3 first.
+# Set ASHDJ_TTS_STREAMING=0 to go back to buffered playback.
+STREAM_TTS = os.getenv("ASHDJ_TTS_STREAMING", "1") != "0"
+PCM_SAMPLE_RATE = 22050
+PCM_FORMAT = f"pcm_{PCM_SAMPLE_RATE}"
+
+# Ring buffer between the download and the mixer. When it is full the
+# download thread blocks, which in turn stops reading from the HTTP stream.
+STREAM_BUFFER_CHUNKS = 32
+
+# Audio is handed to the mixer in segments of this length
+STREAM_SEGMENT_SECONDS = 0.2
 
 # ====== ElevenLabs Setup ======
-api_key = os.getenv("ELEVENLABS_API_KEY")
-if not api_key:
-    raise ValueError("❌ ELEVENLABS_API_KEY not found in environment variables.")
+# The client and the pygame mixer are created by init_tts(): at import time
+# in eager mode, otherwise on first speak() or from a background warm-up.
+client = None
+_mixer_ready = False
+_speech_channel = None
+_init_lock = threading.Lock()
+
+# Each speak() call gets its own stop event, registered here while it runs so
+# stop_speaking() can reach it. Callers can also pass their own should_stop
+# check (see speech_queue). A new call never un-stops an older one.
+_active_stops = set()
+_active_stops_lock = threading.Lock()
+
+
+def _stop_check(stop_event, should_stop=None):
+    def stopped():
+        return stop_event.is_set() or (should_stop is not None and should_stop())
+    return stopped
+
+
+def _init_client():
+    global client
+    with _init_lock:
+        if client is None:
+            from elevenlabs import ElevenLabs
+
+            api_key = os.getenv("ELEVENLABS_API_KEY")
+            if not api_key:
+                raise ValueError("❌ ELEVENLABS_API_KEY not found in environment variables.")
+            client = ElevenLabs(api_key=api_key)
+
+
+def _init_mixer():
+    global _mixer_ready, _speech_channel
+    with _init_lock:
+        if not _mixer_ready:
+            import pygame
+
+            # Initialize pygame mixer for audio playback
+            pygame.mixer.init()
+            # Channel 0 is kept for streamed speech so sound effects can't take it
+            pygame.mixer.set_reserved(1)
+            _speech_channel = pygame.mixer.Channel(0)
+            _mixer_ready = True
+
+
+def init_tts():
+    """Create the ElevenLabs client and initialise the pygame mixer (idempotent)."""
+    _init_client()
+    _init_mixer()
+
+
+if not LAZY_STARTUP:
+    init_tts()
+
+
+# ====== Audio cache ======
+# Most announcements repeat ("Now playing X by Y, Ashif senpai!"), so every
+# synthesized utterance is kept on disk and replayed without an API call.
+# MP3 (buffered mode) and PCM (streaming mode) are cached separately, each in
+# its own directory with its own size limit.
+audio_caches = {}
+for _audio_format, _extension in (("mp3", "mp3"), (PCM_FORMAT, "pcm")):
+    try:
+        audio_caches[_audio_format] = TTSCache(extension=_extension)
+    except OSError as e:
+        print(f"⚠️  TTS cache unavailable ({e}), every phrase will be synthesized", file=sys.__stderr__)
+        break
+
+# Utterances currently being synthesized, so speak() can wait for a pre-warm
+# of the same phrase instead of paying for it twice
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+def _cached_audio(key, audio_format):
+    cache = audio_caches.get(audio_format)
+    return cache.get(key) if cache is not None else None
+
+
+def _claim(key):
+    """Wait out anyone already synthesizing this key. Returns our own Event, or None if we waited."""
+    with _in_flight_lock:
+        pending = _in_flight.get(key)
+        if pending is None:
+            _in_flight[key] = threading.Event()
+            return _in_flight[key]
+    pending.wait()
+    return None
+
+
+def _release(key, claim):
+    if claim is not None:
+        with _in_flight_lock:
+            _in_flight.pop(key, None)
+        claim.set()
+
+
+def _convert(text, voice, model, audio_format):
+    _init_client()
+    # Generate audio from ElevenLabs (streaming response as chunks of bytes)
+    if audio_format == "mp3":
+        return client.text_to_speech.convert(voice_id=voice, model_id=model, text=text)
+    return client.text_to_speech.convert(voice_id=voice, model_id=model, text=text,
+                                         output_format=audio_format)
+
+
+def synthesize(text, voice=DEFAULT_VOICE, model=DEFAULT_MODEL, audio_format="mp3"):
+    """Audio bytes for the text: from the cache when possible, otherwise from ElevenLabs."""
+    key = cache_key(text, voice, model, audio_format)
+    audio_bytes = _cached_audio(key, audio_format)
+    if audio_bytes is not None:
+        return audio_bytes
+
+    claim = _claim(key)
+    if claim is None:
+        # Someone else just synthesized this exact phrase
+        audio_bytes = _cached_audio(key, audio_format)
+        if audio_bytes is not None:
+            return audio_bytes
+
+    try:
+        # Convert audio generator to bytes in memory
+        audio_bytes = b"".join(_convert(text, voice, model, audio_format))
+        if audio_format in audio_caches:
+            audio_caches[audio_format].put(key, audio_bytes)
+        return audio_bytes
+    finally:
+        _release(key, claim)
+
+
+_prewarm_queue = queue.Queue()
+_prewarm_thread = None
+_prewarm_thread_lock = threading.Lock()
+
 
-client = ElevenLabs(api_key=api_key)
+def _prewarm_worker():
+    while True:
+        text, voice, model, audio_format = _prewarm_queue.get()
+        try:
+            synthesize(text, voice, model, audio_format)
+        except Exception as e:
+            print(f"⚠️  TTS pre-warm failed for '{text}': {e}", file=sys.__stderr__)
 
-# Initialize pygame mixer for audio playback
-pygame.mixer.init()
 
-def speak(text, voice="gARvXPexe5VF3cKZBian", model="eleven_multilingual_v2"):
+def prewarm(texts, voice=DEFAULT_VOICE, model=DEFAULT_MODEL):
     """
-    Speak text in anime-style voice using ElevenLabs TTS without saving to disk.
+    Synthesize upcoming announcements in the background so that speaking them
+    later starts straight from the cache. Already-cached phrases are skipped.
     """
+    global _prewarm_thread
+    with _prewarm_thread_lock:
+        if _prewarm_thread is None:
+            _prewarm_thread = threading.Thread(target=_prewarm_worker, daemon=True, name="tts-prewarm")
+            _prewarm_thread.start()
+
+    audio_format = PCM_FORMAT if STREAM_TTS else "mp3"
+    cache = audio_caches.get(audio_format)
+    for text in texts:
+        if cache is None or cache_key(text, voice, model, audio_format) not in cache:
+            _prewarm_queue.put((text, voice, model, audio_format))
+
+
+# ====== Playback metrics ======
+# Time-to-first-audio and total time for recent utterances, to compare modes
+utterance_stats = deque(maxlen=100)
+
+
+def _record_utterance(mode, cached, started, first_audio, finished, audio_seconds):
+    stats = {
+        "mode": mode,
+        "cached": cached,
+        "first_audio_ms": (first_audio - started) * 1000 if first_audio else None,
+        "total_ms": (finished - started) * 1000,
+        "audio_seconds": audio_seconds,
+    }
+    utterance_stats.append(stats)
+    first = f"{stats['first_audio_ms']:.0f} ms" if first_audio else "n/a"
+    print(f"🎙️ TTS {mode}{' (cached)' if cached else ''}: first audio after {first}, "
+          f"done after {stats['total_ms']:.0f} ms ({audio_seconds:.1f}s of speech)",
+          file=sys.__stderr__)
+    return stats
+
+
+# ====== Streaming playback ======
+
+def _pcm_for_mixer(pcm_bytes):
+    """Convert 16-bit mono PCM at PCM_SAMPLE_RATE into the mixer's own sample format."""
+    import numpy as np
+    import pygame
+
+    frequency, size, channels = pygame.mixer.get_init()
+    samples = np.frombuffer(pcm_bytes, dtype="<i2")
+    if frequency != PCM_SAMPLE_RATE:
+        if frequency % PCM_SAMPLE_RATE == 0:
+            samples = np.repeat(samples, frequency // PCM_SAMPLE_RATE)
+        else:
+            positions = np.arange(int(len(samples) * frequency / PCM_SAMPLE_RATE)) * (PCM_SAMPLE_RATE / frequency)
+            samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.int16)
+    if size == 32:
+        samples = (samples / 32768.0).astype(np.float32)
+    elif size == -8:
+        samples = (samples >> 8).astype(np.int8)
+    elif size == 8:
+        samples = ((samples >> 8) + 128).astype(np.uint8)
+    if channels > 1:
+        samples = np.repeat(samples, channels)  # Same sample on every interleaved channel
+    return samples.tobytes()
+
+
+def _play_pcm_stream(chunks, stopped):
+    """
+    Play PCM chunks as they arrive. A download thread fills a bounded ring
+    buffer; this thread cuts it into segments and keeps one segment queued on
+    the speech channel behind the one playing. Returns (all PCM bytes,
+    time the first segment started); the bytes are None if `stopped()`
+    interrupted the download. However playback ends, the download thread
+    stops and closes the chunk stream (and with it the HTTP response).
+    """
+    ring = queue.Queue(maxsize=STREAM_BUFFER_CHUNKS)
+    finished = threading.Event()
+
+    def put(item):
+        # Blocks while the ring is full (backpressure), but gives up once playback is over
+        while not (stopped() or finished.is_set()):
+            try:
+                ring.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def download():
+        try:
+            for chunk in chunks:
+                if chunk and not put(chunk):
+                    return
+        except Exception as e:
+            put(e)
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+            put(None)
+
+    threading.Thread(target=download, daemon=True, name="tts-download").start()
     try:
-        # Generate audio from ElevenLabs (streaming response as bytes)
-        audio = client.text_to_speech.convert(
-            voice_id=voice,
-            model_id=model,
-            text=text
-        )
+        return _play_ring(ring, stopped)
+    finally:
+        finished.set()
 
-        # Convert audio generator to bytes in memory
-        audio_bytes = b"".join(audio)
 
-        # Load audio directly from memory (BytesIO)
-        audio_stream = io.BytesIO(audio_bytes)
+def _play_ring(ring, stopped):
+    """The playing half of _play_pcm_stream: drains the ring onto the speech channel."""
+    import pygame
+
+    segment_bytes = int(PCM_SAMPLE_RATE * STREAM_SEGMENT_SECONDS) * 2
+    received = bytearray()
+    pending = bytearray()
+    first_audio = None
+
+    def play_segment(segment):
+        nonlocal first_audio
+        sound = pygame.mixer.Sound(buffer=_pcm_for_mixer(bytes(segment)))
+        if not _speech_channel.get_busy():
+            _speech_channel.play(sound)
+        else:
+            # A channel holds one queued sound; wait for the slot to free up
+            while _speech_channel.get_queue() is not None and not stopped():
+                pygame.time.wait(5)
+            _speech_channel.queue(sound)
+        if first_audio is None:
+            first_audio = time.perf_counter()
+
+    while not stopped():
+        try:
+            item = ring.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if item is None:
+            break
+        if isinstance(item, Exception):
+            raise item
+        received += item
+        pending += item
+        while len(pending) >= segment_bytes:
+            play_segment(pending[:segment_bytes])
+            del pending[:segment_bytes]
 
-        # Play audio directly
-        pygame.mixer.music.load(audio_stream, "mp3")
-        pygame.mixer.music.play()
+    if stopped():
+        _speech_channel.stop()
+        return None, first_audio
 
-        # Wait until audio finishes playing
-        while pygame.mixer.music.get_busy():
-            pygame.time.wait(100)
+    usable = len(pending) - len(pending) % 2  # Drop a dangling half sample
+    if usable:
+        play_segment(pending[:usable])
+
+    while _speech_channel.get_busy():
+        if stopped():
+            _speech_channel.stop()
+            break
+        pygame.time.wait(20)
+
+    return bytes(received), first_audio
+
+
+def _speak_streaming(text, voice, model, started, stopped):
+    key = cache_key(text, voice, model, PCM_FORMAT)
+    claim = None
+    cached = _cached_audio(key, PCM_FORMAT)
+    if cached is None:
+        claim = _claim(key)
+        if claim is None:
+            cached = _cached_audio(key, PCM_FORMAT)
+
+    if cached is not None:
+        pcm, first_audio = _play_pcm_stream(iter([cached]), stopped)
+    else:
+        try:
+            pcm, first_audio = _play_pcm_stream(_convert(text, voice, model, PCM_FORMAT), stopped)
+            if pcm is not None and PCM_FORMAT in audio_caches:
+                audio_caches[PCM_FORMAT].put(key, pcm)
+        finally:
+            _release(key, claim)
+
+    return _record_utterance("streaming", cached is not None, started, first_audio,
+                             time.perf_counter(), len(pcm or b"") / 2 / PCM_SAMPLE_RATE)
+
+
+def _speak_buffered(text, voice, model, started, stopped):
+    import pygame
+
+    cache = audio_caches.get("mp3")
+    cached = cache is not None and cache_key(text, voice, model, "mp3") in cache
+    audio_bytes = synthesize(text, voice, model)
+    if stopped():
+        return None
+
+    # Load audio directly from memory (BytesIO)
+    audio_stream = io.BytesIO(audio_bytes)
+
+    # Play audio directly
+    pygame.mixer.music.load(audio_stream, "mp3")
+    pygame.mixer.music.play()
+    first_audio = time.perf_counter()
+
+    # Wait until audio finishes playing
+    while pygame.mixer.music.get_busy():
+        if stopped():
+            pygame.mixer.music.stop()
+            break
+        pygame.time.wait(100)
+
+    finished = time.perf_counter()
+    return _record_utterance("buffered", cached, started, first_audio, finished, finished - first_audio)
+
+
+def speak(text, voice=DEFAULT_VOICE, model=DEFAULT_MODEL, stream=None, should_stop=None):
+    """
+    Speak text in anime-style voice using ElevenLabs TTS.
+    Streaming mode (the default, see ASHDJ_TTS_STREAMING) starts playing on
+    the first chunk of audio; buffered mode waits for the whole MP3.
+    Repeated phrases play straight from the on-disk audio cache.
+    Playback ends early once should_stop() returns True or stop_speaking() is called.
+    """
+    started = time.perf_counter()
+    stop_event = threading.Event()
+    stopped = _stop_check(stop_event, should_stop)
+    with _active_stops_lock:
+        _active_stops.add(stop_event)
+    try:
+        _init_mixer()
+        if STREAM_TTS if stream is None else stream:
+            _speak_streaming(text, voice, model, started, stopped)
+        else:
+            _speak_buffered(text, voice, model, started, stopped)
 
     except Exception as e:
         print(f"❌ ElevenLabs TTS error: {e}", file=sys.__stderr__)
+    finally:
+        with _active_stops_lock:
+            _active_stops.discard(stop_event)
+
+def stop_speaking():
+    """Interrupt the utterance currently being spoken (called from another thread)."""
+    with _active_stops_lock:
+        for stop_event in _active_stops:
+            stop_event.set()
 
 # Example usage
 if __name__ == "__main__":
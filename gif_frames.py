@@ -0,0 +1,207 @@
+"""
+GIF Frame Pipeline
+==================
+Decodes and scales the GUI's animated GIF on a worker thread and caches the
+scaled frames on disk. The UI keeps only a small window of frames and asks
+for the others again (read back from the disk cache) when it needs them.
+"""
+
+import hashlib
+import json
+import os
+import queue
+import shutil
+import threading
+
+from PIL import Image, ImageSequence
+
+CACHE_DIR = os.getenv("ASHDJ_CACHE_DIR", ".ashdj_cache")
+
+# GIFs with a missing or near-zero frame delay play at 10 fps, like browsers do
+DEFAULT_DELAY_MS = 100
+MIN_DELAY_MS = 20
+
+# Bump when the scaling/encoding changes so old cached frames are ignored.
+# Compact PNG keeps the cache small; a frame decodes in a few ms off the UI thread.
+CACHE_FORMAT = 3
+
+# Scaled frames waiting for the UI at most
+FRAME_QUEUE = 4
+
+
+class GifFramePipeline:
+    """
+    Produces (index, PIL image, delay_ms) frames of an animated GIF scaled
+    to `size`, through a queue of at most FRAME_QUEUE frames.
+
+    The first run decodes, converts and LANCZOS-resizes each frame on a
+    worker thread and writes it to a cache keyed by the GIF's content hash
+    and the target size; later runs just load the pre-scaled frames. Every
+    frame is produced once, in order. After that (frame_count() is set) the
+    worker only produces the frames asked for with request(), from the disk
+    cache, or by decoding the GIF again if the cache couldn't be written.
+    """
+
+    def __init__(self, gif_path, size, cache_dir=None):
+        self.gif_path = gif_path
+        self.size = tuple(size)
+        self.cache_root = os.path.join(cache_dir or CACHE_DIR, "gif")
+        self.frames = queue.Queue(maxsize=FRAME_QUEUE)
+        self.delays = []
+        self._count = None
+        self._frames_dir = None  # Set once frames can be read back from the disk cache
+        self._requests = queue.Queue()
+        self._pending = set()
+        self._pending_lock = threading.Lock()
+        self._reload_failed = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name="gif-frames")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._requests.put(None)
+
+    def next_frame(self):
+        """
+        The next (index, image, delay_ms) if one is ready, otherwise None. Never
+        blocks the UI. image is None for a frame that couldn't be read back.
+        """
+        try:
+            frame = self.frames.get_nowait()
+        except queue.Empty:
+            return None
+        with self._pending_lock:
+            self._pending.discard(frame[0])
+        return frame
+
+    def frame_count(self):
+        """How many frames the GIF has once each was produced, otherwise None (0 if decoding failed)."""
+        return self._count
+
+    def request(self, index):
+        """Have frame `index` produced again; ignored until the one already asked for is taken."""
+        with self._pending_lock:
+            if index in self._pending:
+                return
+            self._pending.add(index)
+        self._requests.put(index)
+
+    # ---- worker ----
+
+    def _cache_dir(self):
+        digest = hashlib.sha256()
+        with open(self.gif_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                digest.update(chunk)
+        key = f"{digest.hexdigest()[:16]}_{self.size[0]}x{self.size[1]}_v{CACHE_FORMAT}"
+        return os.path.join(self.cache_root, key)
+
+    def _put(self, frame):
+        """Wait for room in the queue; False if stopped first."""
+        while not self._stop.is_set():
+            try:
+                self.frames.put(frame, timeout=0.25)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _scale(self, frame):
+        return frame.copy().convert("RGBA").resize(self.size, Image.LANCZOS)
+
+    def _load_frame(self, index):
+        if self._frames_dir:
+            with Image.open(os.path.join(self._frames_dir, f"frame_{index:04d}.png")) as image:
+                image.load()
+                return image.copy()
+        with Image.open(self.gif_path) as gif:
+            gif.seek(index)
+            return self._scale(gif)
+
+    def _run(self):
+        try:
+            frames_dir = self._cache_dir()
+            if os.path.exists(os.path.join(frames_dir, "meta.json")):
+                self._load_from_cache(frames_dir)
+            else:
+                self._decode_into_cache(frames_dir)
+        except Exception as e:
+            print(f"⚠️  GIF frame pipeline failed: {e}")
+            self.delays = []
+        self._count = len(self.delays)
+        if self._count:
+            self._serve_requests()
+
+    def _serve_requests(self):
+        """Produce frames the UI dropped from its window and needs again."""
+        while not self._stop.is_set():
+            index = self._requests.get()
+            if index is None:
+                return
+            try:
+                image = self._load_frame(index)
+            except Exception as e:
+                if not self._reload_failed:
+                    print(f"⚠️  Could not reload GIF frame {index} ({e}), skipping it")
+                    self._reload_failed = True
+                image = None
+            self._put((index, image, self.delays[index]))
+
+    def _load_from_cache(self, frames_dir):
+        with open(os.path.join(frames_dir, "meta.json")) as f:
+            self.delays = json.load(f)["delays"]
+        self._frames_dir = frames_dir
+        for index, delay in enumerate(self.delays):
+            if not self._put((index, self._load_frame(index), delay)):
+                return
+
+    def _decode_into_cache(self, frames_dir):
+        """First run: decode + scale every frame, handing each to the UI as it's ready."""
+        tmp_dir = f"{frames_dir}.tmp-{os.getpid()}"
+        try:
+            os.makedirs(tmp_dir, exist_ok=True)
+        except OSError as e:
+            print(f"⚠️  GIF frame cache unavailable ({e}), frames won't be cached")
+            tmp_dir = None
+
+        gif = Image.open(self.gif_path)
+        for index, frame in enumerate(ImageSequence.Iterator(gif)):
+            if self._stop.is_set():
+                break
+            delay = frame.info.get("duration") or DEFAULT_DELAY_MS
+            if delay < MIN_DELAY_MS:
+                delay = DEFAULT_DELAY_MS
+            image = self._scale(frame)
+            self.delays.append(delay)
+            if not self._put((index, image, delay)):
+                break
+
+            if tmp_dir:
+                try:
+                    image.save(os.path.join(tmp_dir, f"frame_{index:04d}.png"), compress_level=1)
+                except OSError as e:
+                    print(f"⚠️  Could not write GIF frame cache ({e}), frames will be decoded again when needed")
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+                    tmp_dir = None
+
+        if not tmp_dir:
+            return
+        if self._stop.is_set():
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+        try:
+            with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+                json.dump({"delays": self.delays, "size": list(self.size)}, f)
+            os.replace(tmp_dir, frames_dir)
+            self._frames_dir = frames_dir
+        except OSError as e:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if os.path.exists(os.path.join(frames_dir, "meta.json")):
+                self._frames_dir = frames_dir  # Another instance finished the same cache first
+            else:
+                print(f"⚠️  Could not save GIF frame cache ({e}), frames will be decoded again when needed")
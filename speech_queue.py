@@ -0,0 +1,104 @@
+"""
+Speech Queue
+============
+A single background worker that owns the mixer and speaks announcements in
+priority order, so command handlers never wait for audio to finish.
+"""
+
+import heapq
+import itertools
+import sys
+import threading
+
+from elevenlabs_api import speak
+
+# Lower numbers are spoken first
+URGENT = 0
+NORMAL = 1
+LOW = 2
+
+
+class SpeechQueue:
+    """
+    Priority queue of utterances in front of speak().
+
+    An utterance may carry a `kind` (e.g. "now_playing"). A newer utterance
+    of the same kind replaces any pending one and interrupts it if it is
+    already being spoken, so rapid skips announce only the latest track.
+    `preempt=True` interrupts whatever is currently playing.
+    """
+
+    def __init__(self, speak_fn=speak):
+        self._speak = speak_fn
+        self._heap = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._current = None
+        self._thread = threading.Thread(target=self._run, daemon=True, name="speech")
+        self._thread.start()
+
+    def say(self, text, kind=None, priority=NORMAL, preempt=False):
+        """Queue an utterance and return immediately."""
+        item = {"text": text, "kind": kind, "cancelled": False}
+        with self._condition:
+            if kind is not None:
+                # Coalesce: stale announcements of the same kind are dropped
+                for _, _, pending in self._heap:
+                    if pending["kind"] == kind:
+                        pending["cancelled"] = True
+
+            current = self._current
+            if current is not None and (preempt or (kind is not None and current["kind"] == kind)):
+                current["cancelled"] = True  # speak() polls this and stops playback
+
+            heapq.heappush(self._heap, (priority, next(self._counter), item))
+            self._condition.notify()
+
+    def clear(self):
+        """Drop everything pending and stop the current utterance."""
+        with self._condition:
+            for _, _, pending in self._heap:
+                pending["cancelled"] = True
+            self._heap.clear()
+            if self._current is not None:
+                self._current["cancelled"] = True
+
+    def pending(self):
+        with self._condition:
+            return sum(1 for _, _, item in self._heap if not item["cancelled"])
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap:
+                    self._condition.wait()
+                _, _, item = heapq.heappop(self._heap)
+                if item["cancelled"]:
+                    continue
+                self._current = item
+
+            try:
+                self._speak(item["text"], should_stop=lambda: item["cancelled"])
+            except Exception as e:
+                print(f"❌ Speech queue error: {e}", file=sys.__stderr__)
+            finally:
+                with self._condition:
+                    self._current = None
+
+
+_speech_queue = None
+_speech_queue_lock = threading.Lock()
+
+
+def get_speech_queue():
+    """Process-wide speech queue; its worker thread starts on first use."""
+    global _speech_queue
+    with _speech_queue_lock:
+        if _speech_queue is None:
+            _speech_queue = SpeechQueue()
+        return _speech_queue
+
+
+def say(text, kind=None, priority=NORMAL, preempt=False):
+    """Speak text in the background (see SpeechQueue.say)."""
+    get_speech_queue().say(text, kind=kind, priority=priority, preempt=preempt)
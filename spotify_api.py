@@ -3,9 +3,24 @@ import spotipy
 from spotipy.oauth2 import SpotifyOAuth
 from dotenv import load_dotenv
 
+from api_tracing import trace_spotify
+from spotify_session import build_session, start_token_refresher
+
 load_dotenv()
 
-def authenticate_spotify():
+# Where SpotifyOAuth keeps the token between runs
+CACHE_PATH = ".cache"
+
+
+def has_cached_token():
+    """True if a previous run left an OAuth token, so no interactive login is needed."""
+    return os.path.exists(CACHE_PATH)
+
+def authenticate_spotify(verify=True):
+    """
+    Build the Spotify client. With verify=False the sp.current_user() connection
+    test is skipped so the caller can run verify_connection() in the background.
+    """
     client_id = os.getenv("SPOTIFY_CLIENT_ID")
     client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
     redirect_uri = os.getenv("SPOTIFY_REDIRECT_URI")
@@ -27,7 +42,7 @@ def authenticate_spotify():
 ])
 
     # Create auth manager with cache
-    cache_path = ".cache"
+    cache_path = CACHE_PATH
     auth_manager = SpotifyOAuth(
         client_id=client_id,
         client_secret=client_secret,
@@ -36,11 +51,21 @@ def authenticate_spotify():
         cache_path=cache_path
     )
 
+    # Pooled, rate-limited HTTP session; the token is renewed in the background before it expires
+    client = spotipy.Spotify(auth_manager=auth_manager, requests_session=build_session())
+    start_token_refresher(auth_manager)
+
+    # Per-command call counts/latency for the `stats` command (ASHDJ_API_TRACING=0 to skip)
+    sp = trace_spotify(client)
+    if verify:
+        verify_connection(sp)
+    return sp
+
+
+def verify_connection(sp):
+    """Test the connection (and trigger the OAuth flow if there's no cached token)."""
     try:
-        sp = spotipy.Spotify(auth_manager=auth_manager)
-        # Test the connection
         sp.current_user()
-        return sp
     except Exception as e:
         print(f"Authentication failed: {e}")
         print("Please check your Spotify credentials and try again.")
@@ -0,0 +1,180 @@
+"""
+Spotify HTTP Session
+====================
+The requests session spotipy talks through: a shared keep-alive connection
+pool, a client-side token bucket, one Retry-After backoff shared by every
+thread, and a background refresher that renews the OAuth token early.
+"""
+
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Sustained requests per second and short bursts allowed on top of that
+RATE_PER_SECOND = float(os.getenv("ASHDJ_SPOTIFY_RATE", "10"))
+BURST = int(os.getenv("ASHDJ_SPOTIFY_BURST", "20"))
+
+# Keep-alive connections per host; enough for the search fan-out plus the poller
+POOL_SIZE = int(os.getenv("ASHDJ_SPOTIFY_POOL", "16"))
+
+# How many times one request is re-sent after a 429 before giving up
+MAX_RATE_LIMIT_RETRIES = 3
+
+# Used when a 429 arrives without a usable Retry-After header (seconds)
+DEFAULT_RETRY_AFTER = 1.0
+
+# Refresh the access token this long before it expires (seconds)
+REFRESH_MARGIN = 5 * 60
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate=RATE_PER_SECOND, capacity=BURST):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available. Returns the seconds waited."""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class RateLimitedSession(requests.Session):
+    """
+    requests.Session that waits for the token bucket and for any active
+    Retry-After window before each request. A 429 response pauses *all*
+    threads until Spotify's Retry-After has passed, then the request is sent
+    again. 5xx responses and connection errors are retried by urllib3.
+    """
+
+    def __init__(self, bucket=None, pool_size=POOL_SIZE):
+        super().__init__()
+        self.bucket = bucket or TokenBucket()
+        self.throttled = 0
+        self.rate_limited = 0
+        self._backoff_until = 0.0
+        self._backoff_lock = threading.Lock()
+
+        retry = Retry(
+            total=3,
+            connect=3,
+            read=False,
+            status=3,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset(['GET', 'POST', 'PUT', 'DELETE']),
+            backoff_factor=0.3,
+            respect_retry_after_header=False,  # 429s are handled below, across threads
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def backoff_remaining(self):
+        with self._backoff_lock:
+            return max(0.0, self._backoff_until - time.monotonic())
+
+    def _back_off(self, seconds):
+        with self._backoff_lock:
+            self._backoff_until = max(self._backoff_until, time.monotonic() + seconds)
+
+    def request(self, method, url, *args, **kwargs):
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            pause = self.backoff_remaining()
+            if pause > 0:
+                time.sleep(pause)
+            if self.bucket.acquire() > 0:
+                self.throttled += 1
+
+            response = super().request(method, url, *args, **kwargs)
+            if response.status_code != 429 or attempt == MAX_RATE_LIMIT_RETRIES:
+                return response
+
+            self.rate_limited += 1
+            retry_after = _retry_after_seconds(response)
+            print(f"⏳ Spotify rate limit hit, pausing requests for {retry_after:.1f}s")
+            self._back_off(retry_after)
+            response.close()
+        return response
+
+
+def _retry_after_seconds(response):
+    value = response.headers.get("Retry-After", "")
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return DEFAULT_RETRY_AFTER
+
+
+class TokenRefresher:
+    """
+    Daemon thread that renews the OAuth access token REFRESH_MARGIN seconds
+    before it expires, so no command pays for the refresh round trip.
+    """
+
+    def __init__(self, auth_manager, margin=REFRESH_MARGIN):
+        self.auth_manager = auth_manager
+        self.margin = margin
+        self.refreshes = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="token-refresher")
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                token_info = self.auth_manager.get_cached_token()
+            except Exception as e:
+                print(f"⚠️  Could not read cached Spotify token: {e}")
+                token_info = None
+
+            if not token_info or not token_info.get("refresh_token"):
+                # No login yet; check again once the OAuth flow has had a chance to run
+                self._stop.wait(30)
+                continue
+
+            wait = token_info.get("expires_at", 0) - self.margin - time.time()
+            if wait > 0:
+                self._stop.wait(min(wait, 3600))
+                continue
+
+            try:
+                self.auth_manager.refresh_access_token(token_info["refresh_token"])
+                self.refreshes += 1
+            except Exception as e:
+                print(f"⚠️  Background token refresh failed: {e}")
+                self._stop.wait(60)
+
+
+def build_session():
+    """The shared session to pass to spotipy.Spotify(requests_session=...)."""
+    return RateLimitedSession()
+
+
+def start_token_refresher(auth_manager):
+    return TokenRefresher(auth_manager).start()
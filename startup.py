@@ -0,0 +1,70 @@
+"""
+Startup Helpers
+===============
+Lazy-startup switch, background warm-up and a timing report for app launch.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Defer heavy clients (TTS, mixer, auth check) until first use or warm them in
+# the background. Set ASHDJ_LAZY_STARTUP=0 to initialise everything up front.
+LAZY_STARTUP = os.getenv("ASHDJ_LAZY_STARTUP", "1") != "0"
+
+
+class StartupTimer:
+    """Records how long each startup phase takes, on the main thread or in the background."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = []
+        self.reported = False
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name, background=False):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, background)
+
+    def record(self, name, seconds, background=False):
+        with self._lock:
+            self.phases.append((name, seconds, background))
+            late = self.reported
+        if late:
+            print(f"⏱️  {name} ready at {self.elapsed() * 1000:.0f} ms "
+                  f"(took {seconds * 1000:.1f} ms{' in background' if background else ''})")
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def report(self, output_func=print):
+        with self._lock:
+            phases = list(self.phases)
+            self.reported = True
+        output_func(f"⏱️  Startup: {self.elapsed() * 1000:.0f} ms to first frame "
+                    f"({'lazy' if LAZY_STARTUP else 'eager'} mode)")
+        for name, seconds, background in phases:
+            where = " (background)" if background else ""
+            output_func(f"   {seconds * 1000:8.1f} ms  {name}{where}")
+
+
+startup_timer = StartupTimer()
+
+
+def warm_in_background(name, fn):
+    """Run an initialiser on a daemon thread and record its duration in the startup report."""
+    def run():
+        try:
+            with startup_timer.phase(name, background=True):
+                fn()
+        except Exception as e:
+            print(f"⚠️  Background warm-up '{name}' failed: {e}")
+
+    thread = threading.Thread(target=run, daemon=True, name=f"warm-{name}")
+    thread.start()
+    return thread
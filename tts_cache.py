@@ -0,0 +1,126 @@
+"""
+TTS Audio Cache
+===============
+Content-addressed on-disk cache for synthesized speech, keyed by
+(text, voice, model), with a total size limit and LRU eviction.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+CACHE_DIR = os.getenv("ASHDJ_CACHE_DIR", ".ashdj_cache")
+
+# Size limit of each cache (one per audio format)
+DEFAULT_MAX_BYTES = int(os.getenv("ASHDJ_TTS_CACHE_MB", "100")) * 1024 * 1024
+
+
+def cache_key(text, voice, model, audio_format="mp3"):
+    """Stable content address for one utterance."""
+    payload = json.dumps([text, voice, model, audio_format], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """
+    One file per utterance named by its content hash. File mtimes double as
+    the LRU clock: a hit touches the file, eviction removes the oldest first.
+    By default each extension gets its own directory (tts/<extension>), so
+    caches of different formats never count or evict each other's files.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES, extension="mp3"):
+        self.directory = directory or os.path.join(CACHE_DIR, "tts", extension)
+        self.max_bytes = max_bytes
+        self.extension = extension
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        if directory is None:
+            self._adopt(os.path.join(CACHE_DIR, "tts"))
+
+        # name -> (size, last_used), so eviction doesn't rescan the directory
+        self._entries = {}
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(f".{extension}"):
+                stat = entry.stat()
+                self._entries[entry.name] = (stat.st_size, stat.st_mtime)
+        self._total = sum(size for size, _ in self._entries.values())
+
+    def _adopt(self, old_directory):
+        """Move this format's files over from the directory all formats used to share."""
+        for entry in os.scandir(old_directory):
+            if entry.is_file() and entry.name.endswith(f".{self.extension}"):
+                try:
+                    os.replace(entry.path, os.path.join(self.directory, entry.name))
+                except OSError:
+                    pass
+
+    def _name(self, key):
+        return f"{key}.{self.extension}"
+
+    def __contains__(self, key):
+        return self._name(key) in self._entries
+
+    def get(self, key):
+        """Cached audio bytes, or None on a miss."""
+        name = self._name(key)
+        with self._lock:
+            if name not in self._entries:
+                self.misses += 1
+                return None
+        try:
+            with open(os.path.join(self.directory, name), "rb") as f:
+                data = f.read()
+        except OSError:
+            with self._lock:
+                self._forget(name)
+                self.misses += 1
+            return None
+
+        now = time.time()
+        try:
+            os.utime(os.path.join(self.directory, name), (now, now))
+        except OSError:
+            pass
+        with self._lock:
+            self._entries[name] = (len(data), now)
+            self.hits += 1
+        return data
+
+    def put(self, key, data):
+        name = self._name(key)
+        path = os.path.join(self.directory, name)
+        tmp_path = f"{path}.tmp-{threading.get_ident()}"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._forget(name)
+            self._entries[name] = (len(data), time.time())
+            self._total += len(data)
+            self._evict()
+
+    def _forget(self, name):
+        if name in self._entries:
+            self._total -= self._entries.pop(name)[0]
+
+    def _evict(self):
+        if self._total <= self.max_bytes:
+            return
+        for name, _ in sorted(self._entries.items(), key=lambda item: item[1][1]):
+            if self._total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            self._forget(name)
+
+    def stats(self):
+        return {"entries": len(self._entries), "bytes": self._total,
+                "hits": self.hits, "misses": self.misses}
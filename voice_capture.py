@@ -0,0 +1,410 @@
+"""
+Voice Capture
+=============
+One long-lived input stream, energy-based endpointing over a rolling buffer
+and pluggable speech-to-text backends. Audio is read continuously by a
+capture thread, so pressing Ctrl+M just arms the service for the next
+utterance instead of opening the microphone again.
+
+Feed a WAV file instead of the microphone to try it out offline:
+    python -m voice_capture command.wav [google|sphinx|vosk]
+"""
+
+import abc
+import collections
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import wave
+
+import numpy as np
+
+# 16 kHz mono 16-bit is what every backend accepts; 30 ms frames keep endpointing snappy
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+FRAME_MS = 30
+
+# Endpointing: voiced frames needed to start, trailing silence that ends an utterance
+START_FRAMES = 3
+END_SILENCE_MS = 400
+PRE_ROLL_MS = 300
+MAX_UTTERANCE_SECONDS = 7  # Same limit as the old phrase_time_limit
+LISTEN_TIMEOUT_SECONDS = 5  # How long an armed service waits for speech to start
+
+# Speech must be this many times louder than the running noise floor (and above MIN_ENERGY)
+ENERGY_RATIO = 3.0
+MIN_ENERGY = 300.0
+NOISE_ADAPT_RATE = 0.05
+
+VOICE_BACKEND = os.getenv("ASHDJ_VOICE_BACKEND", "google")
+VOSK_MODEL_PATH = os.getenv("ASHDJ_VOSK_MODEL", "models/vosk")
+
+
+# ---- audio sources ----
+
+class MicrophoneSource:
+    """The default microphone, opened once and kept open (needs PyAudio)."""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS):
+        import speech_recognition as sr
+
+        self.sample_rate = sample_rate
+        self.sample_width = SAMPLE_WIDTH
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self._microphone = sr.Microphone(sample_rate=sample_rate, chunk_size=self.frame_samples)
+        self._microphone.__enter__()
+
+    def read_frame(self):
+        return self._microphone.stream.read(self.frame_samples)
+
+    def close(self):
+        self._microphone.__exit__(None, None, None)
+
+
+class WavFileSource:
+    """
+    Frames from a 16-bit mono WAV file, for testing without a microphone.
+    With realtime=True reads are paced like a live stream. Once the file is
+    exhausted, trailing_silence_ms of silence follow so the last utterance
+    ends, then read_frame() returns b"".
+    """
+
+    def __init__(self, path, frame_ms=FRAME_MS, realtime=False, trailing_silence_ms=1000):
+        self._wav = wave.open(path, "rb")
+        if self._wav.getnchannels() != 1 or self._wav.getsampwidth() != SAMPLE_WIDTH:
+            raise ValueError(f"{path}: expected 16-bit mono audio")
+        self.sample_rate = self._wav.getframerate()
+        self.sample_width = SAMPLE_WIDTH
+        self.frame_samples = self.sample_rate * frame_ms // 1000
+        self.realtime = realtime
+        self._frame_seconds = frame_ms / 1000
+        self._silence_frames = trailing_silence_ms // frame_ms
+        self._next_at = time.monotonic()
+
+    def read_frame(self):
+        if self.realtime:
+            self._next_at += self._frame_seconds
+            time.sleep(max(0.0, self._next_at - time.monotonic()))
+        frame = self._wav.readframes(self.frame_samples)
+        if len(frame) == self.frame_samples * SAMPLE_WIDTH:
+            return frame
+        if self._silence_frames <= 0:
+            return b""
+        self._silence_frames -= 1
+        return frame + b"\x00" * (self.frame_samples * SAMPLE_WIDTH - len(frame))
+
+    def close(self):
+        self._wav.close()
+
+
+# ---- endpointing ----
+
+SPEECH_STARTED = "speech_started"
+
+
+class EnergyEndpointer:
+    """
+    Frame-by-frame speech detector. A rolling pre-roll buffer keeps the audio
+    just before speech was detected, and the noise floor adapts while nobody
+    is talking. push() returns None, SPEECH_STARTED, or the finished
+    utterance's bytes once END_SILENCE_MS of silence (or the length limit) ends it.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS):
+        self.frame_ms = frame_ms
+        self.noise_floor = MIN_ENERGY / ENERGY_RATIO
+        self.in_speech = False
+        self._pre_roll = collections.deque(maxlen=max(1, PRE_ROLL_MS // frame_ms))
+        self._end_frames = max(1, END_SILENCE_MS // frame_ms)
+        self._max_frames = MAX_UTTERANCE_SECONDS * 1000 // frame_ms
+        self._voiced_run = 0
+        self._silent_run = 0
+        self._utterance = []
+
+    @staticmethod
+    def energy(frame):
+        samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+        return float(np.sqrt(np.mean(samples * samples))) if len(samples) else 0.0
+
+    def threshold(self):
+        return max(MIN_ENERGY, self.noise_floor * ENERGY_RATIO)
+
+    def reset(self):
+        self.in_speech = False
+        self._voiced_run = 0
+        self._silent_run = 0
+        self._utterance = []
+
+    def push(self, frame):
+        voiced = self.energy(frame) > self.threshold()
+
+        if not self.in_speech:
+            if not voiced:
+                self.noise_floor += NOISE_ADAPT_RATE * (self.energy(frame) - self.noise_floor)
+            self._pre_roll.append(frame)
+            self._voiced_run = self._voiced_run + 1 if voiced else 0
+            if self._voiced_run >= START_FRAMES:
+                self.in_speech = True
+                self._silent_run = 0
+                self._utterance = list(self._pre_roll)
+                self._pre_roll.clear()
+                return SPEECH_STARTED
+            return None
+
+        self._utterance.append(frame)
+        self._silent_run = 0 if voiced else self._silent_run + 1
+        if self._silent_run >= self._end_frames or len(self._utterance) >= self._max_frames:
+            utterance = b"".join(self._utterance)
+            self.reset()
+            return utterance
+        return None
+
+    def pending_audio(self):
+        """Audio collected for the utterance in progress (pre-roll included)."""
+        return b"".join(self._utterance)
+
+
+# ---- recognizer backends ----
+
+class RecognizerBackend(abc.ABC):
+    """
+    begin() is called when speech starts, feed() with each frame while it
+    lasts, finish() with the whole utterance once it ends. Streaming backends
+    do their work in feed() so finish() is nearly instant; batch backends only
+    implement finish(). finish() returns the text, or None if nothing was understood.
+    """
+
+    name = "base"
+
+    def begin(self, sample_rate, sample_width):
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+
+    def feed(self, frame):
+        pass
+
+    @abc.abstractmethod
+    def finish(self, audio):
+        """Text for the finished utterance (raw PCM bytes), or None."""
+
+
+class _SpeechRecognitionBackend(RecognizerBackend):
+    """Batch backends from the speech_recognition package."""
+
+    method = None
+
+    def __init__(self):
+        import speech_recognition as sr
+
+        self._sr = sr
+        self._recognizer = sr.Recognizer()
+
+    def finish(self, audio):
+        audio_data = self._sr.AudioData(audio, self.sample_rate, self.sample_width)
+        try:
+            return getattr(self._recognizer, self.method)(audio_data)
+        except self._sr.UnknownValueError:
+            return None
+        except self._sr.RequestError as e:
+            print(f"❌ Speech recognition service unavailable: {e}")
+            return None
+
+
+class GoogleBackend(_SpeechRecognitionBackend):
+    name = "google"
+    method = "recognize_google"
+
+
+class SphinxBackend(_SpeechRecognitionBackend):
+    """Offline CMU Sphinx (pip install pocketsphinx)."""
+
+    name = "sphinx"
+    method = "recognize_sphinx"
+
+
+class VoskBackend(RecognizerBackend):
+    """Offline, streaming Vosk recognizer (pip install vosk, model in ASHDJ_VOSK_MODEL)."""
+
+    name = "vosk"
+
+    def __init__(self, model_path=VOSK_MODEL_PATH):
+        import vosk
+
+        self._vosk = vosk
+        self._model = vosk.Model(model_path)
+        self._recognizer = None
+
+    def begin(self, sample_rate, sample_width):
+        super().begin(sample_rate, sample_width)
+        self._recognizer = self._vosk.KaldiRecognizer(self._model, sample_rate)
+
+    def feed(self, frame):
+        self._recognizer.AcceptWaveform(frame)
+
+    def finish(self, audio):
+        text = json.loads(self._recognizer.FinalResult()).get("text", "")
+        return text or None
+
+
+BACKENDS = {
+    "google": GoogleBackend,
+    "sphinx": SphinxBackend,
+    "vosk": VoskBackend,
+}
+
+
+def create_backend(name=VOICE_BACKEND):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown voice backend '{name}' (choose from {', '.join(BACKENDS)})")
+    return BACKENDS[name]()
+
+
+# ---- service ----
+
+class VoiceCaptureService:
+    """
+    Reads `source` on a capture thread and runs the endpointer on every
+    frame. Recognition happens on a second thread, so reading never stalls.
+
+    listen_once() arms the service: the next utterance (within
+    LISTEN_TIMEOUT_SECONDS) is recognized and passed to on_command(text).
+    Arming again while armed just extends the wait. With continuous=True
+    every utterance is recognized (handy for WAV files).
+    """
+
+    def __init__(self, source, backend, on_command, continuous=False):
+        self.source = source
+        self.backend = backend
+        self.on_command = on_command
+        self.continuous = continuous
+        self.endpointer = EnergyEndpointer(source.sample_rate)
+        self.handoff_ms = collections.deque(maxlen=64)
+        self._armed_until = 0.0
+        self._capturing = False
+        self._lock = threading.Lock()
+        self._jobs = queue.Queue()
+        self._stopped = threading.Event()
+        self._capture_thread = threading.Thread(target=self._capture, daemon=True, name="voice-capture")
+        self._recognize_thread = threading.Thread(target=self._recognize, daemon=True, name="voice-recognize")
+
+    def start(self):
+        self._recognize_thread.start()
+        self._capture_thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    def is_alive(self):
+        """False once the capture thread has exited (source exhausted, stopped or failed)."""
+        return self._capture_thread.is_alive()
+
+    def join(self, timeout=None):
+        """Wait until the source is exhausted and every queued utterance is recognized."""
+        self._capture_thread.join(timeout)
+        self._jobs.join()
+
+    def listen_once(self):
+        with self._lock:
+            already = self._armed_until > time.monotonic()
+            self._armed_until = time.monotonic() + LISTEN_TIMEOUT_SECONDS
+        if not already:
+            print("🎙 Listening for command...")
+
+    def _armed(self):
+        with self._lock:
+            if self.continuous or self._armed_until > time.monotonic():
+                return True
+            if self._armed_until:
+                self._armed_until = 0.0
+                print("⌛ Listening timed out.")
+            return False
+
+    def _capture(self):
+        try:
+            while not self._stopped.is_set():
+                frame = self.source.read_frame()
+                if not frame:
+                    break
+                event = self.endpointer.push(frame)
+
+                if event == SPEECH_STARTED:
+                    self._capturing = self._armed()
+                    if self._capturing:
+                        self._jobs.put(("begin", self.endpointer.pending_audio()))
+                elif event is None:
+                    if self._capturing:
+                        self._jobs.put(("feed", frame))
+                    elif not self.endpointer.in_speech:
+                        self._armed()  # Let an unused arm time out
+                else:
+                    if self._capturing:
+                        self._capturing = False
+                        with self._lock:
+                            self._armed_until = 0.0
+                        self._jobs.put(("finish", (event, time.perf_counter())))
+        except Exception as e:
+            print(f"❌ Voice capture stopped: {e}", file=sys.__stderr__)
+        finally:
+            self.source.close()
+
+    def _recognize(self):
+        while True:
+            kind, payload = self._jobs.get()
+            try:
+                if kind == "begin":
+                    self.backend.begin(self.source.sample_rate, self.source.sample_width)
+                    self.backend.feed(payload)
+                elif kind == "feed":
+                    self.backend.feed(payload)
+                else:
+                    audio, ended_at = payload
+                    text = self.backend.finish(audio)
+                    if not text:
+                        print("❌ Could not understand audio.")
+                        continue
+                    handoff = (time.perf_counter() - ended_at) * 1000
+                    self.handoff_ms.append(handoff)
+                    print(f"✅ You said: {text} ({handoff:.0f} ms after end of speech)")
+                    self.on_command(text)
+            except Exception as e:
+                print(f"❌ Voice recognition error: {e}", file=sys.__stderr__)
+            finally:
+                self._jobs.task_done()
+
+
+_microphone_service = None
+_microphone_service_lock = threading.Lock()
+
+
+def get_microphone_service(on_command, backend_name=VOICE_BACKEND):
+    """
+    The app-wide microphone service; the stream is opened on first use and
+    stays open. If its capture thread has died (e.g. the device went away),
+    a new service is started.
+    """
+    global _microphone_service
+    with _microphone_service_lock:
+        if _microphone_service is not None and not _microphone_service.is_alive():
+            print("🎙 Microphone stream stopped, reopening it")
+            _microphone_service = None
+        if _microphone_service is None:
+            _microphone_service = VoiceCaptureService(
+                MicrophoneSource(), create_backend(backend_name), on_command
+            ).start()
+        return _microphone_service
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python -m voice_capture file.wav [google|sphinx|vosk]")
+    service = VoiceCaptureService(
+        WavFileSource(sys.argv[1], realtime=True),
+        create_backend(sys.argv[2] if len(sys.argv) > 2 else VOICE_BACKEND),
+        on_command=lambda text: print(f"➡️  {text}"),
+        continuous=True,
+    ).start()
+    service.join()